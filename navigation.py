@@ -0,0 +1,878 @@
+#!/usr/bin/env python3
+
+import asyncio
+import inspect
+import pickle
+from concurrent.futures import ProcessPoolExecutor, wait
+from bisect import bisect_right
+
+class _Cancelled(object):
+    ''' The (False) result of a transition cancelled by a newer navigation. '''
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'CANCELLED'
+
+CANCELLED = _Cancelled()
+
+def _succeed():
+    ''' The default transition function (picklable, unlike a lambda). '''
+    return True
+
+def _validate_transitions(enter, leave, prefetch=None):
+    ''' Runs a page's transition functions as when skimmed (see
+        HeadlessPage.validate), for use in another process.
+    '''
+    entered = _unless_awaitable(enter() if prefetch is None else
+                                enter(prefetch()))
+    return entered, _unless_awaitable(leave()) if entered else None
+
+def _unless_awaitable(result):
+    ''' Returns result, or None if it is awaitable (closing it if it is a
+        coroutine), as it can't be awaited away from the event loop.
+    '''
+    if not inspect.isawaitable(result):
+        return result
+    if inspect.iscoroutine(result):
+        result.close()
+    return None
+
+class Navigator(object):
+    ''' A GUI-independent engine for navigating between pages. '''
+    __slots__ = ('_pages', '_current_page', '_up_to', '_visited',
+                 '_enforce_upto', '_keys', '_labels', '_inputs', '_dependents',
+                 '_validation_executor', '_loop', '_on_open', '_on_close',
+                 '_on_discard', '_on_relabel')
+
+    def __init__(self, pages=[], up_to=-1, enforce_upto=False, on_open=None,
+                 on_close=None, on_discard=None, validation_executor=None,
+                 loop=None, on_relabel=None):
+        ''' Tracks the current, up to, and viewed pages of a sequence of
+            pages, running their transition functions as they are navigated.
+
+        'pages' is a list of HeadlessPage instances (or instances of
+            subclasses, such as LazyPage).
+
+        'up_to' and 'enforce_upto' are as for PageManager.
+
+        'on_open' is an optional function taking the id of a page, called once
+            it has been successfully entered (e.g. to display it).
+
+        'on_close' is an optional function taking no arguments, called once the
+            current page has been successfully left (e.g. to hide it).
+
+        'on_discard' is an optional function taking a removed page (see
+            remove_pages), to release any resources held for it.
+
+        'validation_executor' is an optional concurrent.futures.Executor for
+            running the pure pages skimmed in forward jumps concurrently (see
+            PageManager).
+
+        'loop' is an optional asyncio event loop, on which awaitable transition
+            results are run to completion (see run). Defaults to None (a loop
+            is created if required).
+
+        'on_relabel' is an optional function taking the id of a page, called
+            after its label is changed (see HeadlessPage.set_label).
+
+        Constructor: Navigator(*list[HeadlessPage], *int, *bool, *func, *func,
+                               *func, *Executor, *asyncio.AbstractEventLoop,
+                               *func)
+
+        '''
+        self._pages = []
+        self._current_page = -1
+        self._up_to = up_to
+        self._visited = bytearray() # 1 for each page viewed, else 0
+        self._enforce_upto = enforce_upto
+        self._keys = {} # page key -> page
+        self._labels = {} # page label -> set of keys of pages with it
+        self._inputs = {} # declared input -> set of pages using it
+        self._dependents = {} # page key -> set of pages depending on it
+        self._validation_executor = validation_executor
+        self._loop = loop
+        self._on_open = on_open
+        self._on_close = on_close
+        self._on_discard = on_discard
+        self._on_relabel = on_relabel
+        self.insert_pages(0, *pages)
+
+    def get_upto(self):
+        ''' Returns the furthest page viewed so far.
+
+        self.get_upto() -> int
+
+        '''
+        return self._up_to
+
+    def get_page_count(self):
+        ''' Returns the current number of pages being navigated.
+
+        self.get_page_count() -> int
+
+        '''
+        return len(self._pages)
+
+    def get_current_page_id(self):
+        ''' Returns the (0-indexed) id of the current page.
+
+        self.get_current_page_id() -> int
+
+        '''
+        return self._current_page
+
+    def get_page(self, page_id=None):
+        ''' Returns the page with the specified id or key (default current).
+
+        self.get_page(*int/key) -> HeadlessPage
+
+        '''
+        if page_id is None:
+            page_id = self._current_page
+        return self._pages[self.get_page_id(page_id)]
+
+    def get_pages(self, start=0, stop=None):
+        ''' Returns a list of the pages with ids in [start, stop).
+
+        self.get_pages(*int, *int) -> list[HeadlessPage]
+
+        '''
+        return self._pages[start:stop]
+
+    def is_visited(self, page_id):
+        ''' Returns True if the specified page (id or key) has been viewed.
+
+        self.is_visited(int/key) -> bool
+
+        '''
+        return self._visited[self.get_page_id(page_id)] == 1
+
+    def all_visited(self, start=0, stop=None):
+        ''' Returns True if every page with id in [start, stop) has been viewed.
+
+        'stop' defaults to the page count.
+
+        self.all_visited(*int, *int) -> bool
+
+        '''
+        return 0 not in self._visited[start:stop]
+
+    def get_visited(self):
+        ''' Returns a bitset of the pages viewed so far (1 if viewed, else 0).
+
+        self.get_visited() -> bytes
+
+        '''
+        return bytes(self._visited)
+
+    def get_visited_bitset(self):
+        ''' Returns the bitset of viewed pages, which is updated in place as
+            pages are navigated, inserted and removed. Must not be modified.
+
+        self.get_visited_bitset() -> bytearray
+
+        '''
+        return self._visited
+
+    def _mark_visited(self, page_id):
+        ''' Marks the specified page as viewed. '''
+        self._visited[page_id] = 1
+        if self._up_to < page_id:
+            self._up_to = page_id
+
+    def get_page_id(self, key):
+        ''' Returns the current integer id (position) of the page with 'key'.
+
+        Keys are stable identifiers for pages, which do not change as pages
+            are inserted and removed. Any integer is treated as a page id, and
+            returned as is. Raises a KeyError if no page has the specified key.
+
+        self.get_page_id(key) -> int
+
+        '''
+        if isinstance(key, int):
+            return key
+        return self._keys[key].get_index()
+
+    def get_page_key(self, page_id=None):
+        ''' Returns the key of the page with the specified integer id.
+
+        If left as None, returns the key of the current page.
+
+        self.get_page_key(*int) -> key
+
+        '''
+        if page_id is None:
+            page_id = self._current_page
+        return self._pages[page_id].get_key()
+
+    def find_page(self, label):
+        ''' Returns the key of a page with the specified label.
+
+        If several pages have the label, the key of the first is returned.
+            Raises a KeyError if no page has the specified label.
+
+        self.find_page(str) -> key
+
+        '''
+        keys = self._labels.get(label)
+        if not keys:
+            raise KeyError(label)
+        return min(keys, key=lambda key: self._keys[key].get_index())
+
+    def _find_index(self, page_id):
+        ''' Returns the integer id for a page id or key, or -1 if unknown. '''
+        if isinstance(page_id, int):
+            return page_id
+        page = self._keys.get(page_id)
+        return -1 if page is None else page.get_index()
+
+    def insert_pages(self, index, *pages):
+        ''' Inserts the specified pages before the page at 'index' (an integer
+            id or page key), returning the id of the first inserted page.
+
+        The current and up to page ids are shifted if pages are inserted at or
+            before them. If no page is currently being viewed, opens page 0.
+
+        Raises a ValueError (inserting no pages) if any key is an integer, or
+            is not unique among the existing and inserted pages.
+
+        self.insert_pages(int/key, *HeadlessPage) -> int
+
+        '''
+        index = self.get_page_id(index)
+        page_count = len(self._pages)
+        if index < 0:
+            index += page_count
+        index = max(0, min(index, page_count))
+        keys = set()
+        for page in pages:
+            key = page.get_key()
+            if key in self._keys or key in keys or isinstance(key, int):
+                raise ValueError('Page keys must be unique and not ' +
+                                 'integers, not {!r}'.format(key))
+            keys.add(key)
+        for page in pages:
+            self._register_page(page)
+        num_pages = len(pages)
+        self._pages[index:index] = pages
+        for page_id in range(index, len(self._pages)):
+            self._pages[page_id].set_index(page_id)
+        self._visited[index:index] = bytes(num_pages)
+        if index < page_count: # before existing pages
+            if self._current_page >= index:
+                self._current_page += num_pages
+            if self._up_to >= index:
+                self._up_to += num_pages
+        elif self._up_to >= index: # pages initially specified as viewed
+            stop = min(self._up_to + 1, len(self._pages))
+            self._visited[index:stop] = b'\x01' * (stop - index)
+
+        if self._current_page < 0 and self._pages:
+            self._current_page = 0
+            self.open_page()
+        return index
+
+    def _register_page(self, page):
+        ''' Indexes the (validated) key, label, inputs, and dependencies of a
+            new page.
+        '''
+        key = page.get_key()
+        self._keys[key] = page
+        self._index_label(page)
+        page.set_navigator(self)
+        for name in page.get_inputs():
+            self._inputs.setdefault(name, set()).add(page)
+        for depend in page.get_depends():
+            self._dependents.setdefault(depend, set()).add(page)
+
+    def remove_pages(self, page_ids):
+        ''' Removes the pages with the specified ids or keys, returning the
+            sorted list of their (former) ids.
+
+        The remaining pages are compacted in a single pass, with the current
+            and up to page ids adjusted for the removed pages before them. If
+            the current page is removed, the page before it (or the new first
+            page) becomes the current page, without being entered. Negative
+            ids count back from the last page. Raises an IndexError (removing
+            no pages) if any id is out of range.
+
+        self.remove_pages(iterable[int/key]) -> list[int]
+
+        '''
+        page_count = len(self._pages)
+        removed = set()
+        for page_id in page_ids:
+            index = self.get_page_id(page_id)
+            if not -page_count <= index < page_count:
+                raise IndexError('page id {} out of range'.format(index))
+            removed.add(index % page_count) # negative ids from the end
+        removed = sorted(removed)
+        if not removed:
+            return removed
+        remaining = []
+        visited = bytearray()
+        index = 0 # of the next id in removed
+        for page_id, page in enumerate(self._pages):
+            if index < len(removed) and page_id == removed[index]:
+                index += 1
+                self._discard_page(page)
+            else:
+                page.set_index(len(remaining))
+                remaining += [page]
+                visited.append(self._visited[page_id])
+        self._pages = remaining
+        self._visited[:] = visited # in place, as shared with displays
+        self._current_page -= bisect_right(removed, self._current_page)
+        self._up_to -= bisect_right(removed, self._up_to)
+        self._current_page = max(self._current_page, 0) if remaining else -1
+        return removed
+
+    def _index_label(self, page):
+        ''' Adds a page to the label index. '''
+        self._labels.setdefault(page.get_label(), set()).add(page.get_key())
+
+    def _unindex_label(self, page, label):
+        ''' Removes a page from the label index, under 'label'. '''
+        keys = self._labels[label]
+        keys.discard(page.get_key())
+        if not keys:
+            del self._labels[label]
+
+    def _relabel_page(self, page, old_label):
+        ''' Moves a relabelled page (see HeadlessPage.set_label) in the label
+            index.
+        '''
+        self._unindex_label(page, old_label)
+        self._index_label(page)
+        if self._on_relabel is not None:
+            self._on_relabel(page.get_index())
+
+    def _discard_page(self, page):
+        ''' Releases all resources held by a removed page. '''
+        del self._keys[page.get_key()]
+        self._unindex_label(page, page.get_label())
+        page.set_navigator(None)
+        for name in page.get_inputs():
+            self._inputs[name].discard(page)
+            if not self._inputs[name]:
+                del self._inputs[name]
+        for depend in page.get_depends():
+            self._dependents[depend].discard(page)
+            if not self._dependents[depend]:
+                del self._dependents[depend]
+        page.discard_prefetch()
+        if self._on_discard is not None:
+            self._on_discard(page)
+
+    def open_page(self, page_id=None):
+        ''' Enters the specified page (default current), returning True and
+            making it the current page on success, else False.
+
+        self.open_page(*int) -> bool
+
+        '''
+        return self.run(self.open_page_steps(page_id))
+
+    def open_page_steps(self, page_id=None):
+        ''' Generator form of open_page (see run). '''
+        if page_id is None:
+            page_id = self._current_page
+
+        if (yield from self._transition_steps(self._pages[page_id],
+                                              'enter_page')):
+            self._current_page = page_id
+            self._mark_visited(page_id)
+            if self._on_open is not None:
+                self._on_open(page_id)
+            return True
+        return False
+
+    def close_page(self):
+        ''' Leaves the current page, returning True on success, else False.
+
+        self.close_page() -> bool
+
+        '''
+        return self.run(self.close_page_steps())
+
+    def close_page_steps(self):
+        ''' Generator form of close_page (see run). '''
+        if (yield from self._transition_steps(self._pages[self._current_page],
+                                              'leave_page')):
+            if self._on_close is not None:
+                self._on_close()
+            return True
+        return False
+
+    def skip_to_page(self, page_id):
+        ''' Returns True on skipping directly to the specified page (without
+            skimming the pages between), else False (see PageManager).
+
+        self.skip_to_page(int/key) -> bool
+
+        '''
+        return self.run(self.skip_to_page_steps(page_id))
+
+    def skip_to_page_steps(self, page_id):
+        ''' Generator form of skip_to_page (see run). '''
+        page_id = self._find_index(page_id)
+        if page_id < 0 or not self._can_skip_to(page_id) or \
+           not (yield from self.open_page_steps(page_id)):
+            yield from self.open_page_steps()
+            return False
+        return True
+
+    def _can_skip_to(self, page_id):
+        ''' Returns True if the specified page can be skipped to, else False.
+
+        If enforce_upto was initialised as True, every page before page_id
+            must have been viewed. Otherwise page_id can be at most one page
+            past the furthest page viewed.
+
+        self._can_skip_to(int) -> bool
+
+        '''
+        if self._enforce_upto:
+            return self.all_visited(0, page_id)
+        return page_id <= self._up_to + 1
+
+    def _can_skim_next(self, page_id):
+        ''' Returns True if the next page can be skimmed, else False.
+
+        Skimming involves calling a page's enter_page() and leave_page() methods
+            without requiring the page to be displayed between the calls.
+
+        The next page is that with the page id: self.get_current_page_id() + 1.
+
+        'page_id' is the integer id of the page being skimmed towards. Skim
+            checks apply to the pages between the current page and page_id.
+
+        self._can_skim_next(int, bool) -> bool
+
+        '''
+        if self._current_page >= page_id - 1:
+            return False
+        return not self._enforce_upto or \
+               self._visited[self._current_page + 1] == 1
+
+    def change_page(self, page_id=None):
+        ''' Returns True on change from the current page to the specified page,
+            else False (see PageManager.change_page).
+
+        self.change_page(*int/key) -> bool
+
+        '''
+        return self.run(self.change_page_steps(page_id))
+
+    def change_page_steps(self, page_id=None):
+        ''' Generator form of change_page (see run). '''
+        if page_id is None:
+            page_id = self._current_page + 1 # next page
+        page_id = self._find_index(page_id)
+
+        # check if new page out of bounds, or if cannot leave current page
+        if page_id >= len(self._pages) or page_id < 0 or \
+           not (yield from self.close_page_steps()):
+            return False
+
+        if page_id < self._current_page:
+            return (yield from self.skip_to_page_steps(page_id))
+
+        levels = self._validation_levels(page_id)
+        if levels and (yield self._validate_levels(levels)) is CANCELLED:
+            yield from self.open_page_steps()
+            return False
+
+        while self._can_skim_next(page_id):
+            self._current_page += 1
+            page = self._pages[self._current_page]
+            if not (yield from self._transition_steps(page, 'enter_page',
+                                                      skim=True)):
+                yield from self.open_page_steps(self._current_page - 1)
+            elif not (yield from self._transition_steps(page, 'leave_page',
+                                                        skim=True)):
+                yield from self.open_page_steps()
+            else:
+                self._mark_visited(self._current_page)
+                continue
+            return False
+
+        return (yield from self.skip_to_page_steps(page_id))
+
+    def _transition_steps(self, page, name, skim=False):
+        ''' Generator yielding the 'enter_page' or 'leave_page' function of
+            page, and returning its result.
+
+        When skimming, the memoized result is returned instead (if the page is
+            pure and has one), without yielding. Results of pure pages are
+            memoized whenever their transition functions are run.
+
+        '''
+        if skim:
+            result = page.get_memo(name)
+            if result is not None:
+                return result
+        result = yield getattr(page, name)
+        page.memoize(name, result)
+        self._invalidate_pages(self._dependents.get(page.get_key(), ()))
+        return result
+
+    def _validation_levels(self, page_id):
+        ''' Returns a list of lists of the pages to be skimmed towards page_id
+            which need their (pure) transitions run, grouped by dependency
+            level.
+
+        Pages in a level only depend on pages in earlier levels (or on pages
+            which are up to date), so can be run concurrently. Pages which
+            cannot be run on the validation executor (and those depending on
+            them, or on any other page which will run when skimmed) are left
+            to be run when skimmed. Returns an empty list if there is no
+            validation executor.
+
+        self._validation_levels(int) -> list[list[HeadlessPage]]
+
+        '''
+        executor = self._validation_executor
+        if executor is None:
+            return []
+        processes = isinstance(executor, ProcessPoolExecutor)
+        start = self._current_page + 1
+        if self._enforce_upto: # skimming stops at the first unviewed page
+            stop = self._visited.find(0, start, page_id)
+            page_id = page_id if stop < 0 else stop
+        levels = []
+        depths = {} # page key -> level, for the pages being run
+        blocked = set() # keys of out of date pages which are not being run
+        for page in self._pages[start:page_id]:
+            if not page.needs_validation():
+                if not page.is_memoized(): # runs (invalidating) when skimmed
+                    blocked.add(page.get_key())
+                continue
+            depends = page.get_depends()
+            if (processes and not page.is_picklable()) or \
+               not blocked.isdisjoint(depends):
+                blocked.add(page.get_key())
+                continue
+            depth = max([depths[depend] + 1 for depend in depends
+                         if depend in depths], default=0)
+            depths[page.get_key()] = depth
+            if depth == len(levels):
+                levels.append([])
+            levels[depth].append(page)
+        return levels
+
+    def _validate_levels(self, levels):
+        ''' Returns a coroutine function which runs the transitions of the
+            pages in each level concurrently on the validation executor (a
+            level at a time), memoizing their results.
+
+        Pages whose transitions return awaitables can't be validated there, so
+            are left (with the pages depending on them) to be run when skimmed.
+
+        The function's 'run_sync' attribute is a function validating the
+            levels without an event loop (see run).
+
+        '''
+        executor = self._validation_executor
+        processes = isinstance(executor, ProcessPoolExecutor)
+        unvalidated = set() # keys of pages left to be run when skimmed
+
+        def submit(level, run):
+            ''' Returns the pages of level which can still be validated, and
+                the results of running their transitions with 'run'.
+            '''
+            pages = []
+            for page in level:
+                if unvalidated.isdisjoint(page.get_depends()):
+                    pages.append(page)
+                else:
+                    unvalidated.add(page.get_key())
+            if processes:
+                return pages, [run(_validate_transitions,
+                                   *page.get_transitions()) for page in pages]
+            return pages, [run(page.validate) for page in pages]
+
+        def memoize(pages, results):
+            ''' Memoizes the (entered, left) results of pages. '''
+            for page, (entered, left) in zip(pages, results):
+                if entered is None or entered and left is None:
+                    unvalidated.add(page.get_key())
+                if entered is not None:
+                    page.memoize('enter_page', entered)
+                if entered and left is not None:
+                    page.memoize('leave_page', left)
+
+        async def validate():
+            loop = asyncio.get_running_loop()
+            for level in levels:
+                pages, runs = submit(level, lambda *args:
+                                     loop.run_in_executor(executor, *args))
+                memoize(pages, await asyncio.gather(*runs))
+            return True
+
+        def run_sync():
+            for level in levels:
+                pages, futures = submit(level, executor.submit)
+                wait(futures)
+                memoize(pages, [future.result() for future in futures])
+            return True
+
+        validate.run_sync = run_sync
+        return validate
+
+    def invalidate(self, *page_ids):
+        ''' Clears the memoized transition results of the specified pages (ids
+            or keys), or of all pages if none are specified, and of the pages
+            depending on them.
+
+        self.invalidate(*int/key) -> None
+
+        '''
+        if not page_ids:
+            page_ids = range(len(self._pages))
+        self._invalidate_pages(self._pages[self.get_page_id(page_id)]
+                               for page_id in page_ids)
+
+    def invalidate_input(self, *inputs):
+        ''' Clears the memoized transition results of all pages which declared
+            any of the specified inputs.
+
+        self.invalidate_input(*hashable) -> None
+
+        '''
+        for name in inputs:
+            self._invalidate_pages(self._inputs.get(name, ()))
+
+    def _invalidate_pages(self, pages):
+        ''' Invalidates pages, and all pages (transitively) depending on them.
+        '''
+        pending = list(pages)
+        done = set()
+        while pending:
+            page = pending.pop()
+            if page in done:
+                continue
+            done.add(page)
+            page.invalidate()
+            pending.extend(self._dependents.get(page.get_key(), ()))
+
+    def run(self, steps):
+        ''' Runs a navigation generator, returning its result.
+
+        Navigation methods are written as generators which yield each
+            transition function (enter_page or leave_page) to be called, and
+            are sent its result. This lets the same navigation logic be run
+            synchronously (here) or asynchronously (as in
+            PageManager.change_page_async).
+
+        Awaitable results are run to completion on the event loop. Pages being
+            skimmed are validated (see _validate_levels) without using the
+            event loop, so this can also be called while the loop is running.
+
+        self.run(generator) -> bool
+
+        '''
+        try:
+            func = next(steps)
+            while True:
+                result = getattr(func, 'run_sync', func)()
+                if inspect.isawaitable(result):
+                    result = self.get_loop().run_until_complete(result)
+                func = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    def get_loop(self):
+        ''' Returns the asyncio event loop, creating it if necessary.
+
+        self.get_loop() -> asyncio.AbstractEventLoop
+
+        '''
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+
+class HeadlessPage(object):
+    ''' A page's transition functions and navigation state, without a GUI. '''
+    __slots__ = ('_enter', 'leave_page', '_label', '_prefetch', '_prefetched',
+                 '_key', '_pure', '_inputs', '_depends', '_memo', '_picklable',
+                 '_index', '_navigator')
+
+    def __init__(self, enter=_succeed, leave=_succeed, label='', prefetch=None,
+                 key=None, *, pure=False, inputs=(), depends=()):
+        ''' The navigable part of a page (see LazyPage for arguments).
+
+        Constructor: HeadlessPage(*func, *func, *str, *func, *key, *bool,
+                                  *iterable[hashable], *iterable[key])
+
+        '''
+        self._enter = enter
+        self.leave_page = leave
+        self._label = label
+        self._prefetch = prefetch
+        self._prefetched = None # Future of the prefetch result, if started
+        self._key = self if key is None else key
+        self._pure = pure
+        self._inputs = tuple(inputs)
+        self._depends = tuple(depends)
+        self._memo = {} # transition name -> memoized result, if pure
+        self._picklable = None # if the transitions can be pickled, once known
+        self._index = -1 # position in the Navigator
+        self._navigator = None # the Navigator the page is in, if any
+
+    def enter_page(self):
+        ''' Runs the page's enter function, returning its result.
+
+        If the page has a prefetch function, its result (waiting for it if
+            still running, or running it now if not started) is consumed and
+            passed to the enter function.
+
+        self.enter_page() -> bool
+
+        '''
+        if self._prefetch is None:
+            return self._enter()
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched is None:
+            return self._enter(self._prefetch())
+        return self._enter(prefetched.result())
+
+    def start_prefetch(self, executor):
+        ''' Starts the page's prefetch function on 'executor', if the page has
+            one and it is not already started.
+
+        self.start_prefetch(concurrent.futures.Executor) -> None
+
+        '''
+        if self._prefetch is not None and self._prefetched is None:
+            self._prefetched = executor.submit(self._prefetch)
+
+    def discard_prefetch(self):
+        ''' Discards any prefetched result, cancelling it if not yet started.
+        '''
+        if self._prefetched is not None:
+            self._prefetched.cancel()
+            self._prefetched = None
+
+    def get_key(self):
+        ''' '''
+        return self._key
+
+    def get_inputs(self):
+        ''' '''
+        return self._inputs
+
+    def get_depends(self):
+        ''' '''
+        return self._depends
+
+    def needs_validation(self):
+        ''' Returns True if the page is pure, and skimming it would run one of
+            its (non-coroutine) transition functions, else False.
+
+        self.needs_validation() -> bool
+
+        '''
+        if not self._pure or inspect.iscoroutinefunction(self._enter) or \
+           inspect.iscoroutinefunction(self.leave_page):
+            return False
+        return not self.is_memoized()
+
+    def is_memoized(self):
+        ''' Returns True if skimming the page would reuse memoized results,
+            rather than run any of its transition functions, else False.
+
+        self.is_memoized() -> bool
+
+        '''
+        entered = self._memo.get('enter_page')
+        return entered is not None and \
+               (not entered or 'leave_page' in self._memo)
+
+    def validate(self):
+        ''' Runs the page's transition functions as when skimmed (leave only if
+            enter succeeds), returning their results (None if not run, or if
+            the result was awaitable, so must be run when skimmed instead).
+
+        self.validate() -> tuple(bool, bool/None)
+
+        '''
+        entered = _unless_awaitable(self.enter_page())
+        return entered, _unless_awaitable(self.leave_page()) if entered \
+                        else None
+
+    def get_transitions(self):
+        ''' Returns the page's enter, leave, and prefetch functions.
+
+        self.get_transitions() -> tuple(func, func, func/None)
+
+        '''
+        return self._enter, self.leave_page, self._prefetch
+
+    def is_picklable(self):
+        ''' Returns True if the page's transition and prefetch functions can be
+            pickled (e.g. to run in another process), else False.
+
+        self.is_picklable() -> bool
+
+        '''
+        if self._picklable is None:
+            try:
+                pickle.dumps(self.get_transitions())
+                self._picklable = True
+            except Exception:
+                self._picklable = False
+        return self._picklable
+
+    def get_memo(self, name):
+        ''' Returns the memoized result of transition 'name' ('enter_page' or
+            'leave_page'), or None if there is none.
+
+        self.get_memo(str) -> bool/None
+
+        '''
+        return self._memo.get(name)
+
+    def memoize(self, name, result):
+        ''' Stores the result of transition 'name', if the page is pure and the
+            transition was not cancelled.
+
+        self.memoize(str, bool) -> None
+
+        '''
+        if self._pure and result is not CANCELLED:
+            self._memo[name] = bool(result)
+
+    def invalidate(self):
+        ''' Clears any memoized transition results. '''
+        self._memo.clear()
+
+    def get_index(self):
+        ''' '''
+        return self._index
+
+    def set_index(self, index):
+        ''' '''
+        self._index = index
+
+    def get_label(self):
+        ''' '''
+        return self._label
+
+    def set_label(self, label):
+        ''' Sets the page's label, updating the label index of the Navigator
+            the page is in (if any).
+
+        self.set_label(str) -> None
+
+        '''
+        old_label, self._label = self._label, label
+        if self._navigator is not None and label != old_label:
+            self._navigator._relabel_page(self, old_label)
+
+    def set_navigator(self, navigator):
+        ''' Sets the Navigator the page is in (None once removed). '''
+        self._navigator = navigator
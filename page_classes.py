@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
 import tkinter as tk
-from math import radians, cos, sin
-import sys
+import tkinter.font as tkfont
+from math import radians, degrees, cos, sin, atan2, hypot
+import re
+import zlib
+import struct
+import base64
+from collections import OrderedDict
+from array import array
+from contextlib import contextmanager
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, bisect_right
+from navigation import Navigator, HeadlessPage, CANCELLED, _succeed
 
 def cellconfigure(container, row, column, **kwargs):
     ''' '''
@@ -11,6 +23,8 @@ def cellconfigure(container, row, column, **kwargs):
 
 class PageManager(tk.Frame):
     ''' A class for managing Pages. '''
+    ASYNC_INTERVAL = 10 # ms between runs of the asyncio loop, while busy
+
     def __init__(self, master=None, pages=[], up_to=-1, enforce_upto=False,
                  *args, **kwargs):
         '''
@@ -24,6 +38,51 @@ class PageManager(tk.Frame):
                 methods that return True on their first call, without user
                 input).
 
+        'pages' is a list of page specifications, each of which is either a
+            tuple of positional arguments or a dictionary of keyword arguments
+            for a LazyPage (enter, leave, label, build). Pages are only built
+            (as Page frames) when first displayed. If the 'progress_bar' and
+            'bar_labels' keyword arguments are True, page labels are drawn
+            under the progress markers (see ProgressBar).
+
+        'page_budget' is an optional keyword argument specifying the maximum
+            number of built Page frames to keep at once. When exceeded, the
+            least-recently-viewed off-screen pages are destroyed, and are
+            rebuilt if revisited. Defaults to None (no limit).
+
+        'loop' is an optional keyword argument specifying an asyncio event loop
+            for running coroutine enter and leave functions (see
+            change_page_async). If not running, the loop is run from the Tk
+            mainloop while navigation is in progress. If specified, clicks on
+            the progress display change page asynchronously. Defaults to None
+            (a loop is created if change_page_async is used).
+
+        'executor' is an optional keyword argument specifying a
+            concurrent.futures.Executor (e.g. a ThreadPoolExecutor) on which
+            change_page_async runs transition functions, so that blocking
+            functions do not freeze the GUI. Functions run this way must not
+            modify Tk widgets. If specified, clicks on the progress display
+            change page asynchronously. Defaults to None.
+
+        'prefetch_lookahead' is an optional keyword argument specifying how
+            many pages after the current page have their prefetch functions
+            run in the background (see LazyPage). Defaults to 1.
+
+        Pages may declare the earlier pages their transition results depend on
+            (see LazyPage 'depends'). Invalidating a page also invalidates the
+            pages depending on it (transitively), as does running (rather than
+            reusing the memoized results of) its transition functions. If an
+            'executor' was specified, forward jumps first run the out of date
+            pure pages being skimmed on it concurrently, one dependency level
+            at a time.
+
+        'validation_executor' is an optional keyword argument specifying a
+            concurrent.futures.Executor on which those pure pages are run
+            instead. If it is a ProcessPoolExecutor, only pages whose transition
+            (and prefetch) functions can be pickled are run on it, using every
+            core for CPU-heavy validators. Results are still applied in page
+            order. Defaults to the 'executor'.
+
         '''
         super().__init__(master)
 
@@ -31,6 +90,18 @@ class PageManager(tk.Frame):
         page_height = kwargs.pop('page_height', 3 * height / 4)
         progress_height = kwargs.pop('progress_height', height / 4)
         width = kwargs.pop('width', self.winfo_screenwidth() / 3)
+        self._page_budget = kwargs.pop('page_budget', None)
+        self._loop = kwargs.pop('loop', None)
+        self._pump_id = None # id of the scheduled asyncio loop run, if any
+        self._executor = kwargs.pop('executor', None)
+        self._validation_executor = kwargs.pop('validation_executor',
+                                               self._executor)
+        self._lookahead = kwargs.pop('prefetch_lookahead', 1)
+        self._prefetch_executor = None # created when first needed
+        self._prefetching = [] # LazyPages with prefetches started
+        self._nav_lock = None # serialises asynchronous navigation
+        self._nav_serial = 0 # number of the latest asynchronous navigation
+        self._nav_future = None # the transition currently being awaited
 
         self._enforce_upto = enforce_upto
         self._setup_pages(up_to, height=page_height, width=width)
@@ -45,20 +116,62 @@ class PageManager(tk.Frame):
 
     def _setup_pages(self, up_to, **kwargs):
         ''' '''
-        self._page_count = 0
-        self._current_page = -1
-        self._up_to = up_to
-        self._pages = []
+        self._nav = Navigator(up_to=up_to, enforce_upto=self._enforce_upto,
+                              on_open=self._on_open, on_close=self._hide_page,
+                              on_discard=self._discard_page,
+                              on_relabel=self._relabel_page,
+                              validation_executor=self._validation_executor,
+                              loop=self._loop)
+        self._shown = None # the LazyPage currently displayed
+        self._realized = OrderedDict() # built LazyPages, least recent first
         cellconfigure(self, row=0, column=0, weight=1)
         self._page_frame = tk.Frame(self, **kwargs)
         self._page_frame.columnconfigure(0, weight=1)
         self._page_frame.grid(sticky='nsew')
 
+    @contextmanager
+    def batch(self):
+        ''' A context manager suspending progress drawing until exit.
+
+        Useful for bulk changes (e.g. adding many batches of pages, then
+            changing page), which are rendered once when the context exits.
+
+            with page_manager.batch():
+                <bulk page changes>
+
+        self.batch() -> context manager
+
+        '''
+        self._progress.suspend_drawing()
+        try:
+            yield self
+        finally:
+            self._progress.resume_drawing()
+
     def _setup_progress(self, *args, **kwargs):
         ''' '''
-        self._progress = Progress(self, self.change_page, self._page_count,
-                                  self._up_to, *args, **kwargs)
+        self._progress = Progress(self, self._request_page,
+                                  self._nav.get_page_count(),
+                                  self._nav.get_upto(), *args,
+                                  get_label=self._get_page_label, **kwargs)
         self._progress.grid(sticky='nsew', row=1)
+        self._progress.set_visited(self._nav.get_visited_bitset())
+
+    def _relabel_page(self, page_id):
+        ''' Redraws the label of a relabelled page. '''
+        self._progress.relabel_page(page_id)
+
+    def _get_page_label(self, page_id):
+        ''' Returns the label of the page with the specified integer id. '''
+        return self._nav.get_page(page_id).get_label()
+
+    def get_navigator(self):
+        ''' Returns the Navigator running the page transitions.
+
+        self.get_navigator() -> Navigator
+
+        '''
+        return self._nav
 
     def get_upto(self):
         ''' Returns the furthest Page instance viewed so far. 
@@ -66,7 +179,33 @@ class PageManager(tk.Frame):
         self.get_upto() -> int
 
         '''
-        return self._up_to
+        return self._nav.get_upto()
+
+    def is_visited(self, page_id):
+        ''' Returns True if the specified page (id or key) has been viewed.
+
+        self.is_visited(int/key) -> bool
+
+        '''
+        return self._nav.is_visited(page_id)
+
+    def all_visited(self, start=0, stop=None):
+        ''' Returns True if every page with id in [start, stop) has been viewed.
+
+        'stop' defaults to the page count.
+
+        self.all_visited(*int, *int) -> bool
+
+        '''
+        return self._nav.all_visited(start, stop)
+
+    def get_visited(self):
+        ''' Returns a bitset of the pages viewed so far (1 if viewed, else 0).
+
+        self.get_visited() -> bytes
+
+        '''
+        return self._nav.get_visited()
 
     def get_page_count(self):
         ''' Returns the current number of Page instances being managed.
@@ -74,7 +213,7 @@ class PageManager(tk.Frame):
         self.get_page_count() -> int
 
         '''
-        return self._page_count
+        return self._nav.get_page_count()
 
     def get_current_page_id(self):
         ''' Returns the (0-indexed) id of the current Page being viewed.
@@ -82,90 +221,209 @@ class PageManager(tk.Frame):
         self.get_current_page_id() -> int
 
         '''
-        return self._current_page
+        return self._nav.get_current_page_id()
 
     def get_page(self, page_id=None):
-        ''' '''
-        if page_id is None:
-            page_id = self._current_page
+        ''' Returns the Page frame with the specified id, building it if needed.
+
+        'page_id' is either the integer id (position) of the page, or its key.
+            If left as None, the current page is returned.
+
+        Pages accessed this way without a 'build' function are never evicted,
+            as their externally added content could not be rebuilt.
+
+        self.get_page(*int/key) -> Page
+
+        '''
+        lazy_page = self._nav.get_page(page_id)
+        page = lazy_page.get_page()
+        self._touch_page(lazy_page)
+        return page
+
+    def get_page_id(self, key):
+        ''' Returns the current integer id (position) of the page with 'key'.
+
+        Keys are stable identifiers for pages, which do not change as pages
+            are inserted and removed. Any integer is treated as a page id, and
+            returned as is. Raises a KeyError if no page has the specified key.
+
+        self.get_page_id(key) -> int
+
+        '''
+        return self._nav.get_page_id(key)
+
+    def get_page_key(self, page_id=None):
+        ''' Returns the key of the page with the specified integer id.
+
+        If left as None, returns the key of the current page.
+
+        self.get_page_key(*int) -> key
+
+        '''
+        return self._nav.get_page_key(page_id)
 
-        return self._pages[page_id]
+    def find_page(self, label):
+        ''' Returns the key of a page with the specified label.
+
+        Raises a KeyError if no page has the specified label.
+
+        self.find_page(str) -> key
+
+        '''
+        return self._nav.find_page(label)
+
+    def set_page_budget(self, budget):
+        ''' Sets the maximum number of built Page frames (None for no limit).
+
+        self.set_page_budget(int/None) -> None
+
+        '''
+        self._page_budget = budget
+        self._evict_pages()
+
+    def _make_page(self, page):
+        ''' Returns a LazyPage from a tuple or dictionary page specification.
+        '''
+        if isinstance(page, dict):
+            return LazyPage(self._page_frame, **page)
+        return LazyPage(self._page_frame, *page)
 
     def add_pages(self, *pages):
-        ''' Adds the specified Page instances to the manager.
+        ''' Adds the specified pages to the manager.
+
+        Pages are registered as LazyPage instances, and are only built when
+            first displayed.
 
         If no page is currently being viewed, sets the current page to 0.
 
-        self.add_pages(*Page) -> None
+        self.add_pages(*tuple/dict) -> None
 
         '''
-        for page in pages:
-            self._pages += [Page(self._page_frame, *page)]
-            self._pages[-1].grid(sticky='nsew')
-            self._pages[-1].grid_remove()
-            self._page_count += 1
-        if self._current_page < 0 and self._page_count > 0:
-            self._current_page = 0
-            self._open_page()
-        pages_added = len(pages)
-        self._progress.add_pages(pages_added)
+        self.insert_pages(self._nav.get_page_count(), *pages)
 
-    def remove_page(self, page_id):
-        ''' '''
-        self._pages.pop(page_id)
-        self._page_count -= 1
-        if self._current_page >= page_id:
-            self._current_page -= 1
-        if self._up_to >= page_id:
-            self._up_to -= 1
-        self._progress.remove_page(page_id)
-
-    def _open_page(self, page_id=None):
-        ''' '''
-        if page_id is None:
-            page_id = self._current_page
-            
-        if self._pages[page_id].enter_page():
-            self._pages[page_id].grid()
-            self._current_page = page_id
-            if self._up_to < page_id:
-                self._up_to = page_id
-            self._progress.change_page(self._current_page)
-            return True
-        return False
+    def insert_pages(self, index, *pages):
+        ''' Inserts the specified pages before the page at 'index' (an integer
+            id or page key).
 
-    def _close_page(self):
-        ''' '''
-        if self._pages[self._current_page].leave_page():
-            self._pages[self._current_page].grid_remove()
-            return True
-        return False
+        Pages are specified as for add_pages, and are spliced in as a single
+            batch. The current and up to page ids are shifted if pages are
+            inserted at or before them, and the progress display is updated
+            once. Inserted pages are not built until first displayed.
 
-    def skip_to_page(self, page_id):
-        ''' '''
-        if page_id > self._up_to+1 or not self._open_page(page_id):
-            self._open_page()
-            return False
-        return True
+        If no page is currently being viewed, sets the current page to 0.
 
-    def _can_skim_next(self, page_id):
-        ''' Returns True if the next page can be skimmed, else False.
+        self.insert_pages(int, *tuple/dict) -> None
 
-        Skimming involves calling a page's enter_page() and leave_page() methods
-            without requiring the page to be displayed between the calls.
+        '''
+        new_pages = [self._make_page(page) for page in pages]
+        index = self._nav.insert_pages(index, *new_pages)
+        if self._nav.get_current_page_id() + self._lookahead >= index:
+            self._start_prefetch() # upcoming pages may have changed
+        self._progress.insert_pages(index, len(new_pages))
 
-        The next page is that with the page id: self.get_current_page_id() + 1.
-            
-        'page_id' is the integer id of the page being skimmed towards. Skim
-            checks apply to the pages between the current page and page_id.
+    def remove_page(self, page_id):
+        ''' Removes the page with the specified id or key (see remove_pages).
 
-        self._can_skim_next(int, bool) -> bool
+        self.remove_page(int/key) -> None
 
         '''
-        if self._enforce_upto:
-            return self._up_to > self._current_page < page_id - 1
-        return self._current_page < page_id - 1
-    
+        self.remove_pages([page_id])
+
+    def remove_pages(self, page_ids):
+        ''' Removes the pages with the specified ids or keys, destroying their
+            frames.
+
+        The remaining pages are compacted in a single pass, with the current
+            and up to page ids adjusted for the removed pages before them, and
+            the progress display redrawn once. If the current page is removed,
+            the page before it (or the new first page) is displayed.
+
+        self.remove_pages(iterable[int/key]) -> None
+
+        '''
+        current_page = self._nav.get_current_page_id()
+        removed = self._nav.remove_pages(page_ids)
+        if not removed:
+            return
+        if current_page in removed and self._nav.get_page_count():
+            self._show_page(self._nav.get_current_page_id())
+            self._start_prefetch()
+        self._progress.remove_pages(removed)
+
+    def _discard_page(self, lazy_page):
+        ''' Releases the display resources held by a removed page. '''
+        lazy_page.destroy_page()
+        self._realized.pop(lazy_page, None)
+        if lazy_page in self._prefetching:
+            self._prefetching.remove(lazy_page)
+        if lazy_page is self._shown:
+            self._shown = None
+
+    def _touch_page(self, lazy_page):
+        ''' Marks lazy_page as most-recently-viewed, and evicts if required. '''
+        self._realized[lazy_page] = None
+        self._realized.move_to_end(lazy_page)
+        self._evict_pages(keep=lazy_page)
+
+    def _evict_pages(self, keep=None):
+        ''' Destroys least-recently-viewed pages beyond the page budget, other
+            than the shown page and 'keep' (a LazyPage being accessed).
+        '''
+        if self._page_budget is None:
+            return
+        excess = len(self._realized) - self._page_budget
+        for lazy_page in list(self._realized):
+            if excess <= 0:
+                break
+            if lazy_page is self._shown or lazy_page is keep or \
+               not lazy_page.evictable():
+                continue
+            lazy_page.destroy_page()
+            del self._realized[lazy_page]
+            excess -= 1
+
+    def _show_page(self, page_id):
+        ''' Displays the specified page, building it if necessary. '''
+        lazy_page = self._nav.get_page(page_id)
+        if self._shown is not lazy_page:
+            self._hide_page()
+        lazy_page.realize().grid(sticky='nsew')
+        self._shown = lazy_page
+        self._touch_page(lazy_page)
+
+    def _hide_page(self):
+        ''' Removes the displayed page (if any) from view. '''
+        if self._shown is not None:
+            self._shown.hide()
+            self._shown = None
+
+    def _on_open(self, page_id):
+        ''' Displays a newly entered page. '''
+        self._show_page(page_id)
+        self._progress.change_page(page_id)
+        self._start_prefetch()
+
+    def _start_prefetch(self):
+        ''' Starts prefetching for the pages after the current page, within
+            the prefetch lookahead, and discards prefetches for other pages.
+        '''
+        start = self._nav.get_current_page_id() + 1
+        upcoming = self._nav.get_pages(start, start + self._lookahead)
+        for lazy_page in self._prefetching:
+            if lazy_page not in upcoming:
+                lazy_page.discard_prefetch()
+        self._prefetching = upcoming
+        if not upcoming:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        for lazy_page in upcoming:
+            lazy_page.start_prefetch(self._prefetch_executor)
+
+    def skip_to_page(self, page_id):
+        ''' '''
+        return self._nav.skip_to_page(page_id)
+
     def change_page(self, page_id=None):
         ''' Returns True on change from the current page to the specified page.
 
@@ -175,7 +433,8 @@ class PageManager(tk.Frame):
             a single forwards change_page call is self.get_upto() + 1. Otherwise
             the furthest reachable page is self.get_page_count() - 1.
 
-        'page_id' is the integer id of the page to change to (starting from 0).
+        'page_id' is the integer id of the page to change to (starting from 0),
+            or the page's key.
             - Changing forwards runs every leave_page() and enter_page()
                 function between the current page and the page being changed to.
             - Changing backwards runs leave_page() on the current page, and
@@ -193,40 +452,162 @@ class PageManager(tk.Frame):
         The current page is 'grid_remove'd, and the new page is 'grid'ed,
             skipping display of any and all pages in between.
 
-        self.change_page(*int, *bool) -> bool
+        Coroutine transition functions are run to completion, blocking the GUI
+            while they run. Use change_page_async to keep it responsive.
+
+        self.change_page(*int/key) -> bool
         
         '''
-        if page_id is None:
-            page_id = self._current_page + 1 # next page
+        return self._nav.change_page(page_id)
 
-        # check if new page out of bounds, or if cannot leave current page
-        if page_id >= self._page_count or page_id < 0 or not self._close_page():
-            return False
-        
-        if page_id < self._current_page:
-            return self.skip_to_page(page_id)
-
-        while self._can_skim_next(page_id):
-            self._current_page += 1
-            if not self._pages[self._current_page].enter_page():
-                self._open_page(self._current_page - 1)
-            elif not self._pages[self._current_page].leave_page():
-                self._open_page()
-            else:
-                if self._up_to < self._current_page:
-                    self._up_to = self._current_page
-                continue
-            return False
-        
-        return self.skip_to_page(page_id)
+    def invalidate(self, *page_ids):
+        ''' Clears the memoized transition results of the specified pages (ids
+            or keys), or of all pages if none are specified, and of the pages
+            depending on them.
+
+        self.invalidate(*int/key) -> None
+
+        '''
+        self._nav.invalidate(*page_ids)
+
+    def invalidate_input(self, *inputs):
+        ''' Clears the memoized transition results of all pages which declared
+            any of the specified inputs.
+
+        self.invalidate_input(*hashable) -> None
+
+        '''
+        self._nav.invalidate_input(*inputs)
+
+    def change_page_async(self, page_id=None):
+        ''' Returns an awaitable asyncio.Task, changing to the specified page.
+
+        The task's result is the bool that change_page would return. Coroutine
+            enter and leave functions are awaited, so the GUI remains
+            responsive while they run, with the same skimming and rollback
+            behaviour as change_page. If an 'executor' was specified at
+            initialisation, other transition functions are run on it, rather
+            than blocking the Tk thread.
+
+        Requesting a new navigation supersedes any that are pending. The
+            transition function in progress is cancelled (if possible) and
+            treated as having returned False, so the pending navigation rolls
+            back as usual, after which the new navigation is run. The progress
+            display shows a busy state until the latest navigation completes.
+
+        The task runs on the 'loop' specified at initialisation, or on a new
+            event loop, which is run from the Tk mainloop as required.
+
+        self.change_page_async(*int/key) -> asyncio.Task
+
+        '''
+        loop = self._get_loop()
+        self._nav_serial += 1 # supersede any pending navigation
+        if self._nav_future is not None:
+            self._nav_future.cancel()
+        task = loop.create_task(self._navigate_async(page_id, self._nav_serial))
+        if self._pump_id is None:
+            self._pump_loop()
+        return task
+
+    async def _navigate_async(self, page_id, serial):
+        ''' Changes to page_id once any earlier navigation has completed,
+            unless superseded before then.
+        '''
+        if self._nav_lock is None:
+            self._nav_lock = asyncio.Lock()
+        self._progress.set_busy(True)
+        try:
+            async with self._nav_lock:
+                if serial != self._nav_serial:
+                    return False # superseded while waiting
+                return await self._run_async(
+                    self._nav.change_page_steps(page_id), serial)
+        finally:
+            if serial == self._nav_serial:
+                self._progress.set_busy(False)
+
+    def _request_page(self, page_id):
+        ''' Changes page in response to the progress display. '''
+        if self._loop is not None or self._executor is not None:
+            self.change_page_async(page_id)
+        else:
+            self.change_page(page_id)
+
+    async def _run_async(self, steps, serial):
+        ''' Runs a navigation generator (see Navigator.run), awaiting awaitable
+            results.
+
+        If the navigation is superseded (or cancelled), the transition function
+            in progress is treated as having returned False. Any subsequent
+            (rollback) transitions are run as normal.
+
+        '''
+        cancelled = False
+        try:
+            func = next(steps)
+            while True:
+                if not cancelled and serial != self._nav_serial:
+                    cancelled, result = True, CANCELLED # superseded
+                else:
+                    try:
+                        result = await self._call_async(func)
+                    except asyncio.CancelledError:
+                        cancelled, result = True, CANCELLED
+                func = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _call_async(self, func):
+        ''' Returns the result of a transition function, run on the executor
+            (if specified), and awaited if awaitable.
+        '''
+        if self._executor is None:
+            result = func()
+        else:
+            result = self._get_loop().run_in_executor(self._executor, func)
+        while inspect.isawaitable(result):
+            self._nav_future = asyncio.ensure_future(result)
+            try:
+                result = await self._nav_future
+            finally:
+                self._nav_future = None
+        return result
+
+    def _get_loop(self):
+        ''' Returns the asyncio event loop, creating it if necessary. '''
+        return self._nav.get_loop()
+
+    def _pump_loop(self):
+        ''' Runs any ready asyncio callbacks, rescheduling itself from the Tk
+            mainloop while tasks remain.
+        '''
+        self._pump_id = None
+        loop = self._get_loop()
+        if loop.is_running() or loop.is_closed():
+            return # the loop is being run elsewhere
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        if asyncio.all_tasks(loop):
+            self._pump_id = self.after(self.ASYNC_INTERVAL, self._pump_loop)
+
+    def destroy(self):
+        ''' '''
+        if self._pump_id is not None:
+            self.after_cancel(self._pump_id)
+            self._pump_id = None
+        for lazy_page in self._prefetching:
+            lazy_page.discard_prefetch()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False)
+        super().destroy()
 
     def str(self):
         ''' '''
         return ('PageManager:\n\tcurrent page: {!s}\n\tup to: {!s} \n\tpage '+\
-                'count: {!s}\n\tpages: {!s}').format(self._current_page,
-                                                     self._up_to,
-                                                     self._page_count,
-                                                     self._pages)
+                'count: {!s}\n\tpages: {!s}').format(
+                    self._nav.get_current_page_id(), self._nav.get_upto(),
+                    self._nav.get_page_count(), self._nav.get_pages())
 
     
 class Page(tk.Frame):
@@ -234,6 +615,7 @@ class Page(tk.Frame):
     def __init__(self, master, enter=lambda:True, leave=lambda:True, label='',
                  *args, **kwargs):
         ''' '''
+        self._lazy_page = kwargs.pop('lazy_page', None) # built by, if any
         super().__init__(master, *args, **kwargs)
         self.enter_page = enter
         self.leave_page = leave
@@ -244,8 +626,132 @@ class Page(tk.Frame):
         return self._label
 
     def set_label(self, label):
-        ''' '''
+        ''' Sets the page's label, and that of the LazyPage which built it (if
+            any), which is the label used by the PageManager.
+
+        self.set_label(str) -> None
+
+        '''
         self._label = label
+        if self._lazy_page is not None and \
+           self._lazy_page.get_label() != label:
+            self._lazy_page.set_label(label)
+
+
+class LazyPage(HeadlessPage):
+    ''' A lightweight page placeholder, which builds its Page when needed. '''
+    __slots__ = ('_master', '_build', '_args', '_kwargs', '_page', '_pinned')
+
+    def __init__(self, master, enter=_succeed, leave=_succeed, label='',
+                 build=None, prefetch=None, key=None, *args, pure=False,
+                 inputs=(), depends=(), **kwargs):
+        ''' A factory for a Page, storing its transition functions and label.
+
+        The Page frame is only created on the first call to realize(), and can
+            be destroyed with destroy_page() and later rebuilt.
+
+        'build' is an optional function taking the newly created Page, which
+            populates it with content. Pages with a build function can be
+            rebuilt after being destroyed without losing their content.
+
+        'prefetch' is an optional function (taking no arguments) which loads
+            any expensive data the page needs. If specified, 'enter' is called
+            with its result. The PageManager runs prefetch functions in the
+            background for upcoming pages (see start_prefetch), so that
+            entering them is fast. Prefetch functions must not modify Tk
+            widgets.
+
+        'key' is an optional stable identifier for the page (any hashable
+            non-integer), which can be used in place of its integer id in
+            PageManager methods. If left as None, the LazyPage itself is used
+            as the key.
+
+        'pure' is an optional keyword-only boolean specifying if the results
+            of 'enter' and 'leave' only depend on the page's declared 'inputs'
+            (and have no side effects). The results of pure pages are memoized,
+            and skimming reuses them rather than re-running the functions,
+            until the page (or one of its inputs) is invalidated through the
+            PageManager. Defaults to False.
+
+        'inputs' is an optional keyword-only iterable of hashable names of the
+            inputs a pure page's transition results depend on (see
+            PageManager.invalidate_input). Defaults to ().
+
+        'depends' is an optional keyword-only iterable of the keys of earlier
+            pages whose state the page's transition results depend on. The page
+            is invalidated whenever they are (see PageManager.invalidate), or
+            their transition functions are run. Defaults to ().
+
+        Constructor: LazyPage(tk.Widget, *func, *func, *str, *func, *func,
+                              *key, *args, **kwargs)
+
+        '''
+        super().__init__(enter, leave, label, prefetch, key, pure=pure,
+                         inputs=inputs, depends=depends)
+        self._master = master
+        self._build = build
+        self._args = args
+        self._kwargs = kwargs
+        self._page = None
+        self._pinned = False
+
+    def realize(self):
+        ''' Returns the Page frame, creating (and building) it if necessary.
+
+        self.realize() -> Page
+
+        '''
+        if self._page is None:
+            self._page = Page(self._master, self._enter, self.leave_page,
+                              self._label, *self._args, lazy_page=self,
+                              **self._kwargs)
+            if self._build is not None:
+                self._build(self._page)
+        return self._page
+
+    def get_page(self):
+        ''' Returns the Page frame for external use, pinning it if its content
+            cannot be rebuilt.
+
+        self.get_page() -> Page
+
+        '''
+        if self._build is None:
+            self._pinned = True
+        return self.realize()
+
+    def is_realized(self):
+        ''' Returns True if the Page frame currently exists, else False.
+
+        self.is_realized() -> bool
+
+        '''
+        return self._page is not None
+
+    def evictable(self):
+        ''' Returns True if the Page frame can be destroyed and later rebuilt.
+
+        self.evictable() -> bool
+
+        '''
+        return self._page is not None and not self._pinned
+
+    def hide(self):
+        ''' Removes the Page frame (if it exists) from view. '''
+        if self._page is not None:
+            self._page.grid_remove()
+
+    def destroy_page(self):
+        ''' Destroys the Page frame (if it exists), freeing its widgets. '''
+        if self._page is not None:
+            self._page.destroy()
+            self._page = None
+
+    def set_label(self, label):
+        ''' '''
+        super().set_label(label)
+        if self._page is not None and self._page.get_label() != label:
+            self._page.set_label(label)
 
 
 class Progress(tk.Frame):
@@ -261,17 +767,29 @@ class Progress(tk.Frame):
         arrow_labels = kwargs.pop('arrow_labels', False)
         number = kwargs.pop('number', False)
         labels = kwargs.pop('labels', False)
+        visible_pages = kwargs.pop('visible_pages', None)
+        sprites = kwargs.pop('sprites', False)
+        label_font = kwargs.pop('label_font', 'TkDefaultFont')
+        self._get_label = kwargs.pop('get_label', None)
         
         super().__init__(master, *args, **kwargs)
         self._master = master
+        self._size = self.winfo_reqwidth(), self.winfo_reqheight()
+        self.bind('<Configure>', self._on_configure, add='+')
         self._num_pages = num_pages
         self._current_page = 0
         self._up_to = up_to
         self._change_page = change_page # used in callback on clicks
         self._displays = {}
+        self._visited = None # bitset of viewed pages (see set_visited)
+        self._dirty = False
+        self._suspended = 0 # number of unresumed suspend_drawing calls
+        self._redraw_id = None # id of the scheduled redraw, if any
 
         if progress_bar:
-            pb = ProgressBar(self, *args, bar_labels=bar_labels, **kwargs)
+            pb = ProgressBar(self, *args, bar_labels=bar_labels,
+                             visible_pages=visible_pages, sprites=sprites,
+                             label_font=label_font, **kwargs)
             # set progress-bar to preferentially expand
             cellconfigure(self, row=0, column=1, weight=1)
             self._displays['progress_bar'] = pb
@@ -312,27 +830,157 @@ class Progress(tk.Frame):
         #pass
 
     def get_size(self):
-        ''' '''
-        self.update() # ensure the retrieved values are current
-        return self.winfo_width(), self.winfo_height()
+        ''' Returns the (width, height) of the frame, as of its last
+            <Configure> event.
+
+        self.get_size() -> tuple(int, int)
+
+        '''
+        return self._size
+
+    def _on_configure(self, event):
+        ''' Caches the new size of the frame. '''
+        self._size = event.width, event.height
 
     def redraw(self):
-        ''' '''
+        ''' Requests a redraw of all displays.
+
+        Requests are coalesced, with a single redraw performed once the Tk
+            event loop is next idle (or when drawing is resumed, if it is
+            currently suspended).
+
+        self.redraw() -> None
+
+        '''
+        self._dirty = True
+        if self._suspended or self._redraw_id is not None:
+            return
+        self._redraw_id = self.after_idle(self.flush)
+
+    def flush(self):
+        ''' Immediately redraws all displays if a redraw has been requested.
+
+        While drawing is suspended, the request is kept until drawing is
+            resumed (see resume_drawing).
+
+        self.flush() -> None
+
+        '''
+        if self._redraw_id is not None:
+            self.after_cancel(self._redraw_id)
+            self._redraw_id = None
+        if self._suspended or not self._dirty:
+            return
+        self._dirty = False
+        for display in self._displays.values():
+            display.redraw(self._num_pages, self._up_to, self._current_page,
+                           labels=self._get_label, visited=self._visited)
+
+    def set_visited(self, visited):
+        ''' Sets the bitset (bytes-like, 0 or 1 per page) of viewed pages to
+            display, in place of a contiguous run up to the up to page.
+
+        The bitset is read on each redraw, so can be updated in place.
+
+        self.set_visited(bytearray) -> None
+
+        '''
+        self._visited = visited
+        self.redraw()
+
+    def set_busy(self, busy):
+        ''' Shows (or clears) a busy state, while a page change is pending.
+
+        self.set_busy(bool) -> None
+
+        '''
+        cursor = 'watch' if busy else ''
+        self.config(cursor=cursor)
         for display in self._displays.values():
-            display.redraw(self._num_pages, self._up_to, self._current_page)
+            display.config(cursor=cursor)
+
+    def suspend_drawing(self):
+        ''' Suspends redrawing until a matching call to resume_drawing.
+
+        Calls can be nested, in which case drawing is resumed once every
+            suspend_drawing call has been matched.
+
+        self.suspend_drawing() -> None
+
+        '''
+        self._suspended += 1
+
+    def resume_drawing(self):
+        ''' Resumes drawing, immediately redrawing if any requests were made
+            while drawing was suspended.
+
+        self.resume_drawing() -> None
+
+        '''
+        self._suspended -= 1
+        if not self._suspended:
+            self.flush()
+
+    def destroy(self):
+        ''' '''
+        if self._redraw_id is not None:
+            self.after_cancel(self._redraw_id)
+            self._redraw_id = None
+        super().destroy()
+
+    def relabel_page(self, page_id):
+        ''' Redraws the label of the page with the specified id, after it has
+            been changed.
+
+        self.relabel_page(int) -> None
+
+        '''
+        if 'progress_bar' in self._displays:
+            self._displays['progress_bar'].invalidate_label(page_id)
+        self.redraw()
+
+    def _invalidate_labels(self):
+        ''' Clears the page labels cached by the displays, as page ids have
+            changed.
+        '''
+        if 'progress_bar' in self._displays:
+            self._displays['progress_bar'].invalidate_labels()
 
     def add_pages(self, n):
         ''' '''
+        self.insert_pages(self._num_pages, n)
+
+    def insert_pages(self, index, n):
+        ''' Inserts n pages before the page at 'index'.
+
+        self.insert_pages(int, int) -> None
+
+        '''
+        if index < self._num_pages: # before existing pages
+            if self._current_page >= index:
+                self._current_page += n
+            if self._up_to >= index:
+                self._up_to += n
         self._num_pages += n
+        self._invalidate_labels()
         self.redraw()
 
     def remove_page(self, page_id):
         ''' '''
-        self._num_pages -= 1
-        if self._current_page >= page_id:
-            self._current_page -= 1
-        if self._up_to >= page_id:
-            self._up_to -= 1
+        self.remove_pages([page_id])
+
+    def remove_pages(self, page_ids):
+        ''' Removes the pages with the specified (sorted, unique) ids.
+
+        self.remove_pages(list[int]) -> None
+
+        '''
+        self._num_pages -= len(page_ids)
+        self._current_page = max(self._current_page - \
+                                 bisect_right(page_ids, self._current_page), 0)
+        if self._up_to >= 0:
+            self._up_to -= bisect_right(page_ids, self._up_to)
+        self._invalidate_labels()
         self.redraw()
 
 class ProgressBar(tk.Canvas):
@@ -340,14 +988,75 @@ class ProgressBar(tk.Canvas):
     OUTER = 'outer'
     UPTO = 'up_to'
     CURRENT = 'current'
+    LAYERS = (OUTER, UPTO, CURRENT) # in drawing order, bottom to top
+    GEOMETRY_CACHE_SIZE = 4
+    DENSE_SPACING = 2 # px between markers, below which runs are drawn instead
+    RESIZE_DELAY = 100 # ms without resizing before a full redraw
+    LABEL = 'label'
+    LABEL_GAP = 4 # minimum px between labels
+    # whitespace escapes (a backslash before a newline would join lines)
+    _TCL_ESCAPES = {'\n': '\\n', '\t': '\\t', '\r': '\\r', '\v': '\\v',
+                    '\f': '\\f'}
     WIRE = 'wireframe'
     FILLED = 'filled'
     
     def __init__(self, master, *args, **kwargs):
-        ''' '''
+        ''' A canvas displaying a marker for each page, and progress through
+            them.
+
+        'visible_pages' is an optional keyword argument limiting the number of
+            page markers drawn at once. If there are more pages than that, only
+            a window of pages is drawn, which follows the current page and can
+            be scrolled with the mouse wheel, or zoomed with Control+wheel.
+            Defaults to None (all pages are drawn).
+
+        'sprites' is an optional keyword argument specifying if marker circles
+            should be drawn as images, each pre-rendered once per layer, mode,
+            colour, radius and shape (see _get_sprite), rather than as ovals
+            and arcs which Tk rasterizes on every repaint. Defaults to False.
+
+        If the markers would be closer together than DENSE_SPACING pixels, each
+            layer is instead drawn as a bar segment per run of consecutive
+            pages in it, so the number of items depends on the number of runs
+            rather than the number of pages.
+
+        'bar_labels' is an optional keyword argument specifying if page labels
+            (see redraw) should be drawn under the markers, in 'label_font'
+            (default 'TkDefaultFont'). Labels which would overlap an earlier
+            label, or the current page's label, are left out. Defaults to True.
+
+        Constructor: ProgressBar(tk.Widget, *args, **kwargs)
+
+        '''
         self._parse_kwargs(kwargs) # ratios, colours, modes, thetas, bar_labels
         super().__init__(master, *args, **kwargs)
         self._master = master
+        self._labels = None # sequence or function of page labels
+        self._font = tkfont.Font(root=self, font=self._label_font) \
+                     if self._bar_labels else None
+        self._label_height = self._font.metrics('linespace') \
+                             if self._bar_labels else 0
+        self._text_widths = {} # (font, text) -> width in px
+        self.invalidate_labels()
+        self._first = 0 # id of the first visible page
+        self._num_visible = 0
+        self._num_pages = 0
+        self._up_to = -1
+        self._current_page = None
+        self._visited = None
+        self._geometries = OrderedDict() # cached BarGeometry instances
+        self._width, self._height = self.winfo_reqwidth(), \
+                                    self.winfo_reqheight()
+        self._scaled_size = (0, 0) # the size the drawn items fit
+        self._resize_id = None # id of the scheduled redraw after resizing
+        self._clear()
+        self.bind('<Configure>', self._on_configure, add='+')
+        self.bind('<MouseWheel>', self._on_wheel)
+        self.bind('<Control-MouseWheel>', self._on_zoom)
+        self.bind('<Button-4>', lambda e: self.scroll(-1))
+        self.bind('<Button-5>', lambda e: self.scroll(1))
+        self.bind('<Control-Button-4>', lambda e: self.zoom(1/2))
+        self.bind('<Control-Button-5>', lambda e: self.zoom(2))
 
     def _parse_kwargs(self, kwargs):
         ''' '''
@@ -362,164 +1071,806 @@ class ProgressBar(tk.Canvas):
                                              self.UPTO: 25,
                                              self.CURRENT: 10})
         self._bar_labels = kwargs.pop('bar_labels', True)
+        self._label_font = kwargs.pop('label_font', 'TkDefaultFont')
+        self._visible_pages = kwargs.pop('visible_pages', None)
+        self._use_sprites = kwargs.pop('sprites', False)
+        self._sprites = {} # sprite key -> PhotoImage (see _get_sprite)
+        self._sprite_radii = None # the marker radii of the cached sprites
+        self._rgba = {None: bytes(4)} # colour -> RGBA pixel of sprites
 
     def get_size(self):
-        ''' '''
-        self.update() # ensure the retrieved values are current
-        self._width, self._height = self.winfo_width(), self.winfo_height()
+        ''' Returns the (width, height) of the canvas, as of its last
+            <Configure> event.
+
+        The size is cached rather than queried, so this never flushes the Tk
+            event loop.
+
+        self.get_size() -> tuple(int, int)
+
+        '''
         return self._width, self._height
 
-    def redraw(self, num_pages, up_to, current_page, labels=[]):
+    def _on_configure(self, event):
+        ''' Caches the new size of the canvas, and redraws if it changed.
+
+        While the size keeps changing (e.g. as a window edge is dragged), the
+            drawn items are scaled to fit with a single canvas command, and
+            only fully redrawn once the size has been unchanged for
+            RESIZE_DELAY ms.
+
+        '''
+        size = event.width, event.height
+        if size == (self._width, self._height):
+            return
+        self._width, self._height = size
+        if not self._num_visible:
+            return
+        width, height = self._scaled_size
+        if width > 0 and height > 0:
+            self._queue('scale', 'all', 0, 0, size[0] / width,
+                        size[1] / height)
+            self._send_commands()
+            self._scaled_size = size
+        if self._resize_id is not None:
+            self.after_cancel(self._resize_id)
+        self._resize_id = self.after(self.RESIZE_DELAY, self._settle)
+
+    def _settle(self):
+        ''' Fully redraws at the new size, once resizing has settled. '''
+        self._resize_id = None
+        self._refresh()
+
+    def destroy(self):
         ''' '''
+        if self._resize_id is not None:
+            self.after_cancel(self._resize_id)
+            self._resize_id = None
+        super().destroy()
+
+    def redraw(self, num_pages, up_to, current_page, labels=None,
+               visited=None):
+        ''' Updates the progress bar to display the specified progress.
+
+        'labels' is an optional sequence of page labels (by page id), or
+            function returning the label of a page id. If specified (and
+            bar_labels is True), space is left under the markers for the labels
+            of the visible pages (see _draw_labels). Labels are cached by page
+            id while the sequence or function and number of pages are unchanged
+            (see invalidate_labels).
+
+        'visited' is an optional bitset (bytes-like, 0 or 1 per page) of the
+            pages viewed so far. If specified, it is drawn instead of a
+            contiguous run of pages up to 'up_to'.
+
+        The drawn state of each marker is retained between calls, and only the
+            markers whose state has changed are redrawn. If the size, the
+            number of pages, or the window of visible pages has changed, every
+            marker is redrawn, reusing the existing canvas items (see
+            _draw_part) rather than creating new ones.
+
+        All canvas commands for a redraw are sent to Tcl as a single batch (see
+            _send_commands), so a redraw takes a constant number of round trips
+            regardless of the number of pages.
+
+        self.redraw(int, int, int, *list[str]/func, *bytes) -> None
+
+        '''
+        if labels is not self._labels or num_pages != self._num_pages:
+            self.invalidate_labels()
+        self._labels = labels
+        if labels and not callable(labels):
+            labels = labels.__getitem__ # sequence of labels by page id
         if num_pages == 0:
+            if self._resize_id is not None:
+                self.after_cancel(self._resize_id)
+                self._resize_id = None
+            self._recycle()
+            self._send_commands()
+            self._num_pages = self._num_visible = 0
             return
-        
-        """
-        self.delete('all') # TEMPORARY full redraw every call
-        
-        """
-        # ANTI FLASH CODE
-        try:
-            width, height = self._width, self._height
-            # check if size or number of pages changed
-            if (width, height) != self.get_size() or \
-               self._num_pages != num_pages:
-                self.delete('all') # full refresh and redraw
-            elif self._current_page > current_page: # if moving backwards
-                # delete pre-drawn items
-                items = self.find_withtag(self.CURRENT)
-                for item in items:
-                    tags = list(self.gettags(item))
-                    tags.remove(self.CURRENT)
-                    try:
-                        tags.remove('circle')
-                    except Exception:
-                        tags.remove('line')
-                        
-                    if tags[0] != self.UPTO and int(tags[0]) > current_page:
-                        self.delete(item)
-        except (NameError, AttributeError) as e:
-            print(e, file=sys.stderr)
-            self.delete('all') # drawing for the first time
-        #"""
-        
+
+        self._update_window(num_pages, current_page)
+        layout = (self.get_size(), num_pages, self._first, self._num_visible,
+                  self._get_label_height())
+        if layout != self._layout:
+            self._recycle() # full refresh and redraw
+            self._layout = layout
+            self._scaled_size = self.get_size()
+
         self._num_pages = num_pages
         self._current_page = current_page
-        positions, max_r = self._get_positions()
+        self._up_to = up_to
+        self._visited = visited
+        geometry = self._get_geometry()
 
         if self._bar_labels:
-            self._draw_labels(positions, max_r, labels)
-        self._draw_outer(positions, max_r * self._ratios[0])
-        self._draw_upto(positions, max_r * self._ratios[1], up_to)
-        self._draw_current(positions, max_r * self._ratios[2], current_page)
+            self._draw_labels(geometry, labels)
+        if geometry.spacing < self.DENSE_SPACING:
+            self._draw_dense(geometry, up_to, current_page, visited)
+            self._send_commands()
+            return
 
-    def _draw_labels(self, positions, r, labels):
-        ''' '''
-        if not labels or len(labels) > len(positions):
+        self._draw_outer(geometry)
+        self._draw_upto(geometry, up_to, visited)
+        self._draw_current(geometry, current_page)
+        self._send_commands()
+
+    def _draw_dense(self, geometry, up_to, current, visited=None):
+        ''' Draws each layer as a bar segment per run of consecutive visible
+            pages in it (see _draw_runs).
+        '''
+        first, count = self._first, self._num_visible
+        if visited is not None:
+            members = bytes(visited[first:first + count])
+            up_to_runs = [(match.start(), match.end()) for match in
+                          re.finditer(b'\x01+', members)]
+        else:
+            if up_to == -1:
+                up_to = first + count - 1
+            end = max(0, min(up_to - first + 1, count))
+            up_to_runs = [(0, end)] if end else []
+        end = max(0, min(current - first + 1, count)) # as in _draw_current
+        self._draw_runs(geometry, self.OUTER, [(0, count)])
+        self._draw_runs(geometry, self.UPTO, up_to_runs)
+        self._draw_runs(geometry, self.CURRENT, [(0, end)] if end else [])
+
+    def _draw_runs(self, geometry, key, runs):
+        ''' Draws the (start, stop) index runs of layer 'key' as rectangles,
+            reusing the layer's existing segment items.
+        '''
+        colour = self._colours[key]
+        options = {'tags': (key, 'segment'), 'state': tk.NORMAL}
+        if self._modes[key] == self.FILLED:
+            options.update(fill=colour, outline=colour)
+        half_height = geometry.y * 0.9 * self._ratios[self.LAYERS.index(key)]
+        y0, y1 = geometry.y - half_height, geometry.y + half_height
+        segments = self._segments[key]
+        for number, (start, stop) in enumerate(runs):
+            x0 = start * geometry.spacing
+            coords = (x0, y0, max(stop * geometry.spacing, x0 + 1), y1)
+            if number < len(segments):
+                self._queue('coords', segments[number], *coords)
+                self._queue('itemconfigure', segments[number],
+                            *self._tcl_options(options))
+            else: # id is added to segments once the batch is sent
+                self._creating.append((len(self._commands), segments))
+                self._queue('create', 'rectangle', *coords,
+                            *self._tcl_options(options))
+                self._counts[key] += 1
+                self._restack = True
+        for item in segments[len(runs):self._num_runs[key]]:
+            self._queue('itemconfigure', item, '-state', tk.HIDDEN)
+        self._num_runs[key] = len(runs)
+
+    def _refresh(self):
+        ''' Redraws with the most recently drawn progress. '''
+        self.redraw(self._num_pages, self._up_to, self._current_page,
+                    labels=self._labels, visited=self._visited)
+
+    def _clear(self):
+        ''' Deletes all drawn items, and forgets their drawn state. '''
+        self.delete('all')
+        self._commands = [] # Tcl commands batched for _send_commands
+        self._creating = [] # (command index, item ids) for batched creations
+        self._restack = False # if items were created in the current batch
+        self._pool = {} # (layer, index, part, spec) -> hidden item ids
+        self._segments = {layer: [] for layer in self.LAYERS} # run item ids
+        self._counts = {layer: 0 for layer in self.LAYERS} # parts created
+        self._free_labels = [] # hidden label item ids, for reuse
+        self._forget()
+
+    def _forget(self):
+        ''' Forgets the drawn state of all markers. '''
+        self._layout = None
+        self._drawn = {} # (layer, page, part) -> (spec, item ids)
+        self._ends = {}  # layer -> id of the last page drawn in that layer
+        self._members = {} # layer -> bitset of the visible pages drawn
+        self._num_runs = {layer: 0 for layer in self.LAYERS} # runs shown
+        self._shown_labels = {} # page -> (text, x, item ids) of drawn labels
+
+    def _recycle(self):
+        ''' Hides all drawn items and returns them to the pool, for reuse by
+            the markers at the same positions in the new layout.
+
+        Pooled items are keyed by their index in the window of visible pages,
+            so the pool holds at most a set of items per marker state for the
+            largest window drawn, however often the size and page count change.
+
+        '''
+        first = self._layout[2] if self._layout else self._first
+        for layer in self.LAYERS + (self.LABEL,):
+            self._queue('itemconfigure', layer, '-state', tk.HIDDEN)
+        for (key, page, part), (spec, items) in self._drawn.items():
+            self._pool_items(key, page - first, part, spec, items)
+        self._free_labels.extend(items for text, x, items in
+                                 self._shown_labels.values())
+        self._forget()
+
+    def _pool_items(self, key, index, part, spec, items):
+        ''' Stores the (hidden) items of a marker part in the pool. '''
+        old_items = self._pool.get((key, index, part, spec))
+        if old_items is not None: # already pooled - keep only one set
+            self._queue('delete', *old_items)
+            self._counts[key] -= 1
+        self._pool[(key, index, part, spec)] = items
+
+    def _update_window(self, num_pages, current_page):
+        ''' Updates the window of visible pages, following the current page if
+            it has changed.
+        '''
+        visible = self._visible_pages
+        if visible is None or visible >= num_pages:
+            self._first, self._num_visible = 0, num_pages
             return
-        pass # do actual drawing of labels under position markers
-        # for label in labels: ...
 
-    def _draw_positions(self, positions, r, key, **kwargs):
-        ''' '''
+        self._num_visible = visible
+        if current_page != self._current_page and \
+           not self._first <= current_page < self._first + visible:
+            self._first = current_page - visible // 2 # centre current page
+        self._first = max(0, min(self._first, num_pages - visible))
+
+    def scroll(self, pages):
+        ''' Scrolls the window of visible pages by the specified number of
+            pages (negative to scroll backwards).
+
+        Has no effect unless visible_pages is set and fewer than all the pages.
+
+        self.scroll(int) -> None
+
+        '''
+        if self._num_visible in (0, self._num_pages):
+            return
+        first = self._first
+        self._first = max(0, min(first + pages,
+                                 self._num_pages - self._num_visible))
+        if self._first != first:
+            self._refresh()
+
+    def zoom(self, factor):
+        ''' Scales the number of visible pages by 'factor', keeping the current
+            page in view.
+
+        Has no effect unless visible_pages is set.
+
+        self.zoom(float) -> None
+
+        '''
+        if self._visible_pages is None or self._num_visible == 0:
+            return
+        self._visible_pages = max(1, min(round(self._visible_pages * factor),
+                                         self._num_pages))
+        self._first = self._current_page - self._visible_pages // 2
+        self._refresh()
+
+    def _on_wheel(self, event):
+        ''' Scrolls the visible pages on mouse-wheel movement. '''
+        self.scroll(-1 if event.delta > 0 else 1)
+
+    def _on_zoom(self, event):
+        ''' Zooms the visible pages on Control+mouse-wheel movement. '''
+        self.zoom(1/2 if event.delta > 0 else 2)
+
+    def _draw_labels(self, geometry, labels):
+        ''' Draws the labels of the visible pages under their markers, leaving
+            out those which would overlap (see _place_labels).
+
+        Only the labels whose text or position has changed are redrawn, and
+            hidden label items are reused before any are created, so moving the
+            current page redraws O(1) labels.
+
+        '''
+        placed = self._place_labels(geometry, labels) if labels else {}
+        shown = self._shown_labels
+        removed = [] # items of labels no longer placed
+        for page in [page for page, (text, x, items) in shown.items()
+                     if placed.get(page) != (text, x)]:
+            text, x, items = shown.pop(page)
+            if page not in placed:
+                removed.append(items)
+                continue
+            shown[page] = placed[page] + (items,)
+            self._draw_label(geometry, page, items)
+        for page in placed.keys() - shown.keys():
+            items = removed.pop() if removed else \
+                    self._free_labels.pop() if self._free_labels else []
+            shown[page] = placed[page] + (items,)
+            self._draw_label(geometry, page, items)
+        for items in removed:
+            self._queue('itemconfigure', items[0], '-state', tk.HIDDEN)
+            self._free_labels.append(items)
+
+    def _draw_label(self, geometry, page, items):
+        ''' Draws the label of a page with an existing item (if 'items' holds
+            its id), else a new item whose id is added to 'items'.
+        '''
+        text, x = self._shown_labels[page][:2]
+        options = {'text': text, 'font': str(self._font), 'state': tk.NORMAL,
+                   'tags': (self.LABEL, str(page))}
+        coords = (x, geometry.label_y)
+        if items:
+            self._queue('coords', items[0], *coords)
+            self._queue('itemconfigure', items[0], *self._tcl_options(options))
+        else:
+            self._creating.append((len(self._commands), items))
+            self._queue('create', 'text', *coords, *self._tcl_options(options))
+
+    def _place_labels(self, geometry, labels):
+        ''' Returns a dictionary of page id: (text, x) of the labels to draw,
+            chosen greedily from left to right after the current page's label.
+
+        A label whose centre is within LABEL_GAP of the previous label can't
+            be placed, so those pages are skipped (by bisection of the marker
+            positions) without getting or measuring their labels. If a label
+            doesn't fit, the following labels are assumed to be as wide, and
+            skipped until one would fit. Runs of pages without labels are also
+            skipped (see _next_labelled). The number of labels got and measured
+            therefore depends on the number placed, rather than the number of
+            visible pages.
+
+        '''
+        xs, first = geometry.xs, self._first
+        placed = {}
+        blocked = (float('inf'), float('inf')) # current page's label span
+        current = self._current_page - first
+        if 0 <= current < len(xs):
+            label = self._measure_label(geometry, current, labels)
+            if label is not None:
+                placed[self._current_page] = label[:2]
+                blocked = label[2:]
+        index, edge = 0, -self.LABEL_GAP # right edge of the last label
+        while True:
+            index = bisect_left(xs, edge + self.LABEL_GAP, index)
+            index = self._next_labelled(first + index, first + len(xs),
+                                        labels) - first
+            if index >= len(xs):
+                break
+            if xs[index] >= blocked[0] - self.LABEL_GAP:
+                edge, blocked = blocked[1], (float('inf'), float('inf'))
+                continue # skip past the current page's label
+            text, x, left, right = self._measure_label(geometry, index, labels)
+            if right > blocked[0] - self.LABEL_GAP:
+                edge, blocked = blocked[1], (float('inf'), float('inf'))
+            elif left < edge + self.LABEL_GAP: # skip to where it would fit
+                index = bisect_left(xs, edge + self.LABEL_GAP +
+                                    (right - left) / 2, index + 1)
+            else:
+                placed[first + index] = (text, x)
+                edge = right
+                index += 1
+        return placed
+
+    def _get_label(self, page, labels):
+        ''' Returns the label of a page, from the cache of page labels if got
+            before (see invalidate_labels).
+        '''
+        text = self._label_texts.get(page)
+        if text is None:
+            text = self._label_texts[page] = labels(page)
+        return text
+
+    def _next_labelled(self, page, stop, labels):
+        ''' Returns the id of the first page from 'page' (before 'stop') with a
+            label, else stop.
+
+        The pages found to have no labels are linked to the next page to check,
+            with the links shortened as they are followed, so each run of
+            unlabelled pages is only checked once (see invalidate_labels).
+
+        '''
+        skipped = []
+        while page < stop:
+            if page in self._label_skips:
+                skipped.append(page)
+                page = self._label_skips[page]
+            elif not self._get_label(page, labels):
+                skipped.append(page)
+                page += 1
+            else:
+                break
+        for skipped_page in skipped:
+            self._label_skips[skipped_page] = page
+        return page
+
+    def invalidate_labels(self):
+        ''' Clears the cached page labels, so they are got again (e.g. after
+            pages are inserted or removed) when next drawn.
+
+        self.invalidate_labels() -> None
+
+        '''
+        self._label_texts = {} # page -> label
+        self._label_skips = {} # unlabelled page -> next page to check
+
+    def invalidate_label(self, page):
+        ''' Clears the cached label of a page, so it is got again (e.g. after
+            it is relabelled) when next drawn.
+
+        self.invalidate_label(int) -> None
+
+        '''
+        self._label_texts.pop(page, None)
+        self._label_skips = {} # links may skip over the page
+
+    def _measure_label(self, geometry, index, labels):
+        ''' Returns (text, x, left, right) of the label of the page at 'index'
+            in the visible pages, shifted to fit within the canvas, or None if
+            it has no label.
+        '''
+        text = self._get_label(self._first + index, labels)
+        if not text:
+            return None
+        key = (self._label_font, text)
+        width = self._text_widths.get(key)
+        if width is None:
+            width = self._text_widths[key] = self._font.measure(text)
+        x = max(width / 2, min(geometry.xs[index], self._width - width / 2))
+        return text, x, x - width / 2, x + width / 2
+
+    def _draw_layer(self, geometry, key, end):
+        ''' Updates the markers of layer 'key' to extend up to page 'end'.
+
+        Only the markers between the previously drawn end and the new end can
+            change state, so a single page step redraws O(1) markers.
+
+        '''
+        first = self._first
+        end = max(first - 1, min(end, first + len(geometry.xs) - 1))
+        old_end = self._ends.get(key, first - 1)
+        if end == old_end:
+            return
+        self._ends[key] = end
+
+        pages = range(max(first, min(end, old_end)), max(end, old_end) + 1)
+        self._update_markers(geometry, key, pages,
+                             lambda page: first <= page <= end)
+
+    def _draw_members(self, geometry, key, members):
+        ''' Updates the markers of layer 'key' to mark the visible pages set in
+            the bitset 'members' (a bytes-like of 0/1 per page).
+
+        The changed pages are found by comparing with the previously drawn
+            members as integers, so only markers next to changes are redrawn.
+
+        '''
+        first, count = self._first, len(geometry.xs)
+        members = bytes(members[first:first + count]).ljust(count, b'\0')
+        old_members = self._members.get(key, bytes(count))
+        changes = int.from_bytes(old_members, 'big') ^ \
+                  int.from_bytes(members, 'big')
+        self._members[key] = members
+        if not changes:
+            return
+
+        # the first/last changed bytes hold the highest/lowest set bits
+        low = count - 1 - (changes.bit_length() - 1) // 8
+        high = count - 1 - ((changes & -changes).bit_length() - 1) // 8
+        pages = range(first + max(low - 1, 0), first + min(high + 2, count))
+        self._update_markers(geometry, key, pages,
+                             lambda page: 0 <= page - first < count and \
+                                          members[page - first] == 1)
+
+    def _update_markers(self, geometry, key, pages, inside):
+        ''' Updates the markers of layer 'key' for the specified pages.
+
+        'inside' is a function returning True if a page is in the layer (and
+            visible), else False.
+
+        '''
+        for page in pages:
+            self._update_marker(geometry, key, page, inside)
+
+    def _update_marker(self, geometry, key, page, inside):
+        ''' Redraws the parts of a marker whose state has changed.
+
+        The shape of a marker depends on whether its neighbours are also in
+            the layer, as runs of pages are joined with lines.
+
+        '''
+        specs = {}
+        if inside(page):
+            after = inside(page + 1)
+            if inside(page - 1):
+                pos = 'center' if after else 'end'
+            else:
+                pos = 'start' if after else 'misc'
+            mode = self._modes[key]
+            specs['circle'] = pos if mode == self.WIRE or pos == 'misc' \
+                              else mode
+            if after:
+                specs['line'] = mode
+
+        for part in ('circle', 'line'):
+            spec = specs.get(part)
+            old_spec, items = self._drawn.pop((key, page, part), (None, ()))
+            if spec == old_spec:
+                if items:
+                    self._drawn[(key, page, part)] = (spec, items)
+                continue
+            if items:
+                for item in items:
+                    self._queue('itemconfigure', item, '-state', tk.HIDDEN)
+                self._pool_items(key, page - self._first, part, old_spec,
+                                 items)
+            if spec is not None:
+                items, new = self._draw_part(geometry, key, page, part, spec)
+                self._drawn[(key, page, part)] = (spec, items)
+                if new:
+                    self._counts[key] += 1
+
+    def _draw_part(self, geometry, key, page, part, spec):
+        ''' Draws one part ('circle' or 'line') of a marker.
+
+        Hidden items previously drawn for the same part and spec at the same
+            index (in the window of visible pages) are taken from the pool and
+            moved into place, so canvas items are only created the first time
+            each is needed.
+
+        Commands are batched (see _queue), so the ids of newly created items
+            are only added to the returned list once the batch is sent.
+
+        Returns a tuple of a list of the ids of the part's items, and True if
+            they were newly created, else False.
+
+        '''
         colour = self._colours[key]
         mode = self._modes[key]
         theta = self._thetas[key]
-        
-        kwargs['fill'] = colour
+        r = geometry.radii[key]
+
+        kwargs = {'fill': colour, 'tags': (key, str(page), part)}
         if mode == self.FILLED:
             kwargs['outline'] = colour
-                
-        cx, cy = positions[0]
-        tags = (key, '0')
-        if len(positions) == 1:
-            self._draw_circle(cx, cy, r, 'misc', tags=tags, **kwargs)
+
+        index = page - self._first
+        cx, cy = geometry.xs[index], geometry.y
+        if part == 'circle':
+            if spec == 'misc':
+                shapes = self._circle_shapes(cx, cy, r, spec, **kwargs)
+            else:
+                shapes = self._circle_shapes(cx, cy, r, mode, pos=spec,
+                                             theta=theta, **kwargs)
+            if self._use_sprites:
+                sprite = self._get_sprite(geometry, key, spec, shapes)
+                shapes = [('image', (cx, cy), {'image': sprite,
+                                               'tags': kwargs['tags']})]
+        else:
+            cx1, cy1 = geometry.xs[index + 1], geometry.y
+            rct, rst = geometry.offsets[key]
+            shapes = self._line_shapes(cx, cy, cx1, cy1, rct, rst, mode,
+                                       **kwargs)
+
+        items = self._pool.pop((key, index, part, spec), None)
+        if items is None:
+            items = []
+            for kind, coords, options in shapes:
+                self._creating.append((len(self._commands), items))
+                self._queue('create', kind, *coords,
+                            *self._tcl_options(options))
+            self._restack = True
+            return items, True
+        for item, (kind, coords, options) in zip(items, shapes):
+            self._queue('coords', item, *coords)
+            self._queue('itemconfigure', item, '-state', tk.NORMAL,
+                        *self._tcl_options(options))
+        return items, False
+
+    def _get_sprite(self, geometry, key, spec, shapes):
+        ''' Returns the PhotoImage of a marker circle, rendering it from its
+            shapes (see _circle_shapes) if not already cached.
+
+        Sprites are cached by (layer, mode, colour, radius, spec, theta), and
+            the cache is cleared whenever the marker radii change.
+
+        '''
+        if self._sprite_radii != geometry.radii:
+            self._sprites.clear()
+            self._sprite_radii = geometry.radii
+        sprite_key = (key, self._modes[key], self._colours[key],
+                      geometry.radii[key], spec, self._thetas[key])
+        sprite = self._sprites.get(sprite_key)
+        if sprite is None:
+            sprite = self._render_sprite(geometry.radii[key], shapes)
+            self._sprites[sprite_key] = sprite
+        return sprite
+
+    def _render_sprite(self, r, shapes):
+        ''' Returns a new PhotoImage of circle shapes of radius r (as from
+            _circle_shapes), centred in the image.
+
+        Ovals are filled (if they have a fill colour) and outlined, and arcs
+            are outlined over their extent, with a 1 pixel outline. The pixels
+            are built row by row, then sent to Tcl as a single PNG (see
+            _encode_png), so a sprite takes one round trip to create however
+            large it is, and its unpainted pixels are transparent.
+
+        '''
+        size = int(2 * r) + 2
+        centre = size / 2
+        rows = []
+        for y in range(size):
+            dy = centre - (y + 0.5) # upwards, as for arc angles
+            row = bytearray()
+            for x in range(size):
+                dx = x + 0.5 - centre
+                distance = hypot(dx, dy)
+                angle = degrees(atan2(dy, dx)) % 360
+                colour = None
+                for kind, coords, options in shapes:
+                    if distance > r:
+                        break
+                    outline = options.get('outline') or 'black'
+                    if r - distance <= 1: # on the outline
+                        if kind == 'oval' or (angle - options['start']) % \
+                           360 <= options['extent']:
+                            colour = outline
+                    elif kind == 'oval' and options.get('fill'):
+                        colour = options['fill']
+                row += self._get_rgba(colour)
+            rows.append(row)
+        return tk.PhotoImage(master=self, data=self._encode_png(rows),
+                             format='png')
+
+    def _get_rgba(self, colour):
+        ''' Returns the RGBA pixel of a Tk colour (transparent if None), cached
+            so each colour is looked up once.
+        '''
+        rgba = self._rgba.get(colour)
+        if rgba is None:
+            rgba = self._rgba[colour] = bytes(
+                [value >> 8 for value in self.winfo_rgb(colour)] + [255])
+        return rgba
+
+    @staticmethod
+    def _encode_png(rows):
+        ''' Returns the base64 PNG data of an image from its rows of RGBA
+            pixels (as bytes-like objects of equal length).
+        '''
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + \
+                   struct.pack('>I', zlib.crc32(kind + data))
+        header = struct.pack('>IIBBBBB', len(rows[0]) // 4, len(rows), 8, 6,
+                             0, 0, 0) # 8-bit RGBA, no interlacing
+        pixels = b''.join(b'\x00' + bytes(row) for row in rows) # no filter
+        png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + \
+              chunk(b'IDAT', zlib.compress(pixels)) + chunk(b'IEND', b'')
+        return base64.b64encode(png).decode('ascii')
+
+    def _queue(self, *words):
+        ''' Adds a command for the canvas (e.g. 'coords', item, *coords) to the
+            batch sent by _send_commands.
+        '''
+        self._commands.append(' '.join(self._tcl_word(word) for word in
+                                       (self._w,) + words))
+
+    def _send_commands(self):
+        ''' Runs all batched canvas commands with a single Tcl evaluation.
+
+        The batch is evaluated as a Tcl list of the results of each command, so
+            the ids of created items are returned in the same round trip. If
+            items were created, the layers are then restacked (bottom to top)
+            in the same batch.
+
+        '''
+        if self._restack:
+            self._restack = False
+            below = None
+            for layer in self.LAYERS:
+                if not self._counts[layer]:
+                    continue
+                if below is not None:
+                    self._queue('raise', layer, below)
+                below = layer
+        if not self._commands:
             return
-        rct = r * cos(radians(theta))
-        rst = r * sin(radians(theta))
-        cx1, cy1 = positions[1]
-        self._draw_circle(cx, cy, r, mode, pos='start', theta=theta, tags=tags,
-                          **kwargs)
-        self._draw_line(cx, cy, cx1, cy1, rct, rst, mode, tags=tags, **kwargs)
-        positions = positions[1:]
-            
-        for index in range(len(positions)-1):
-            tags = (key, str(index+1))
-            cx, cy = positions[index]
-            self._draw_circle(cx, cy, r, mode, theta=theta, tags=tags, **kwargs)
-            cx1, cy1 = positions[index+1]
-            self._draw_line(cx, cy, cx1, cy1, rct, rst, mode, tags=tags,
-                            **kwargs)
-            
-        tags = (key, str(len(positions)))
-        self._draw_circle(cx1, cy1, r, mode, pos='end', theta=theta,
-                          tags=tags, **kwargs)
-
-    def _draw_outer(self, positions, r, **kwargs):
+        commands, self._commands = self._commands, []
+        creating, self._creating = self._creating, []
+        results = self.tk.splitlist(self.tk.eval(
+            'list ' + ' '.join('[' + command + ']' for command in commands)))
+        for index, items in creating:
+            items.append(int(results[index]))
+
+    @classmethod
+    def _tcl_options(cls, options):
+        ''' Returns a list of the words of the options in a dictionary (with
+            None values omitted, as in tkinter).
+        '''
+        words = []
+        for name, value in options.items():
+            if value is not None:
+                words += ['-' + name, value]
+        return words
+
+    @classmethod
+    def _tcl_word(cls, value):
+        ''' Returns value (a string, number, or tuple of them as a list) quoted
+            as a single Tcl word.
+        '''
+        if isinstance(value, (tuple, list)):
+            value = ' '.join(cls._tcl_word(item) for item in value)
+        word = str(value)
+        if not word:
+            return '{}'
+        return re.sub(r'[\[\]{}$\\";\s]', lambda match: cls._TCL_ESCAPES.get(
+            match.group(), '\\' + match.group()), word)
+
+    def _draw_outer(self, geometry):
         ''' '''
-        self._draw_positions(positions, r, self.OUTER, **kwargs)
+        self._draw_layer(geometry, self.OUTER,
+                         self._first + len(geometry.xs) - 1)
 
-    def _draw_upto(self, positions, r, up_to, **kwargs):
+    def _draw_upto(self, geometry, up_to, visited=None):
         ''' '''
+        if visited is not None:
+            self._draw_members(geometry, self.UPTO, visited)
+            return
         if up_to == -1:
-            up_to = len(positions)-1
-        self._draw_positions(positions[0:up_to+1], r, self.UPTO, **kwargs)
+            up_to = self._first + len(geometry.xs) - 1
+        self._draw_layer(geometry, self.UPTO, up_to)
 
-    def _draw_current(self, positions, r, current, **kwargs):
+    def _draw_current(self, geometry, current):
         ''' '''
-        self._draw_positions(positions[0:current+1], r, self.CURRENT, **kwargs)
+        self._draw_layer(geometry, self.CURRENT, current)
 
-    def _get_positions(self):
-        ''' '''
-        num_pages = self._num_pages
-        labels = self._bar_labels
-        c_width, c_height = self.get_size()
-        # TODO: redifine c_height depending on label height
-        p_vert = c_height/2
-        spacing = c_width/num_pages
-        positions = [[spacing/2, p_vert]]
-        for i in range(num_pages-1):
-            positions += [[positions[-1][0] + spacing, p_vert]]
-        return positions, min(c_height/2, spacing/2) * 0.9
-
-    def _tags_duplicate(self, kwargs, *add):
-        ''' '''
-        tags = list(kwargs.pop('tags', tuple()))
-        tags += [*add]
-        kwargs['tags'] = tuple(tags)
+    def _get_label_height(self):
+        ''' Returns the height of the strip left under the markers for labels
+            (0 if no labels are drawn).
+        '''
+        return self._label_height if self._labels else 0
 
-    def _draw_line(self, cx, cy, cx1, cy1, rct, rst, mode, **kwargs):
-        ''' '''
-        if self._tags_duplicate(kwargs, 'line'):
-            return
-        if mode == 'wireframe':
-            self.create_line(cx + rct, cy + rst, cx1 - rct, cy1 + rst, **kwargs)
-            self.create_line(cx + rct, cy - rst, cx1 - rct, cy1 - rst, **kwargs)
+    def _get_geometry(self):
+        ''' Returns the BarGeometry for the current size and visible pages.
+
+        Geometries are cached by (width, height, number of visible pages,
+            ratios, thetas, label height), so repeated redraws and clicks at
+            the same size skip all geometry calculations.
+
+        self._get_geometry() -> BarGeometry
+
+        '''
+        label_height = self._get_label_height()
+        key = (self.get_size(), self._num_visible, tuple(self._ratios),
+               tuple(self._thetas[layer] for layer in self.LAYERS),
+               label_height)
+        geometry = self._geometries.get(key)
+        if geometry is None:
+            geometry = BarGeometry(*key[0], self._num_visible, self._ratios,
+                                   self._thetas, self.LAYERS, label_height)
+            self._geometries[key] = geometry
+            if len(self._geometries) > self.GEOMETRY_CACHE_SIZE:
+                self._geometries.popitem(last=False) # oldest geometry
         else:
-            self.create_rectangle(cx + rct, cy + rst, cx1 - rct, cy1 - rst,
-                                  **kwargs)
+            self._geometries.move_to_end(key)
+        return geometry
 
-    def _draw_circle(self, cx, cy, r, mode, **kwargs):
-        ''' '''
-        if self._tags_duplicate(kwargs, 'circle'):
-            return
+    def _line_shapes(self, cx, cy, cx1, cy1, rct, rst, mode, **kwargs):
+        ''' Returns a list of (item type, coords, options) of the items joining
+            two markers.
+        '''
         if mode == 'wireframe':
-            pos = kwargs.pop('pos', 'center')
-            if 'theta' in kwargs:
-                theta = kwargs.pop('theta')
-                if pos == 'start':
-                    kwargs.update(start=theta, end=-theta)
-                elif pos == 'end':
-                    kwargs.update(start=180+theta, end=180-theta)
-                elif pos == 'center':
-                    kwargs.update(start=theta, end=180-theta)  # top arc
-                    self.create_circle_arc(cx, cy, r, style=tk.ARC, **kwargs)
-                    kwargs.update(start=180+theta, end=-theta) # bottom arc
-            self.create_circle_arc(cx, cy, r, style=tk.ARC, **kwargs)
-        else:
-            for excess in ['pos', 'theta']:
-                kwargs.pop(excess, None)
-            self.create_ellipse(cx, cy, r, **kwargs)
+            return [('line', (cx + rct, cy + rst, cx1 - rct, cy1 + rst),
+                     kwargs),
+                    ('line', (cx + rct, cy - rst, cx1 - rct, cy1 - rst),
+                     kwargs)]
+        return [('rectangle', (cx + rct, cy + rst, cx1 - rct, cy1 - rst),
+                 kwargs)]
+
+    def _circle_shapes(self, cx, cy, r, mode, pos='center', theta=0,
+                       **kwargs):
+        ''' Returns a list of (item type, coords, options) of the items of a
+            marker circle.
+        '''
+        box = (cx - r, cy - r, cx + r, cy + r)
+        if mode != 'wireframe':
+            return [('oval', box, kwargs)]
+        if pos == 'start':
+            arcs = [(theta, -theta)]
+        elif pos == 'end':
+            arcs = [(180+theta, 180-theta)]
+        else: # top and bottom arcs
+            arcs = [(theta, 180-theta), (180+theta, -theta)]
+        return [('arc', box, dict(kwargs, style=tk.ARC, start=start,
+                                  extent=(end - start) % 360))
+                for start, end in arcs]
 
     def create_ellipse(self, cx, cy, a, b=None, **kwargs):
         ''' Draws an ellipse centered on (cx,cy) with axes (a,b) on the canvas.
@@ -562,19 +1913,58 @@ class ProgressBar(tk.Canvas):
         return self.create_arc(cx-r, cy-r, cx+r, cy+r, **kwargs)
 
     def find_withtags(self, *tags):
-        ''' '''
-        #return False
-        return tuple([item for item in self.find_withtag(tags[0]) if \
-                      list(self.gettags(item)) == list(tags)])
+        ''' Returns a tuple of the ids of the displayed items with exactly the
+            specified tags.
+
+        Marker items are tagged (layer, page, part), the segments of runs of
+            pages (see DENSE_SPACING) are tagged (layer, 'segment'), and page
+            labels are tagged ('label', page). Items are looked up in the index
+            of drawn items kept as they are created, reused and hidden, so no
+            Tcl queries are made.
+
+        self.find_withtags(*str) -> tuple(int)
+
+        '''
+        self._send_commands() # so that newly created items have ids
+        if len(tags) == 2 and tags[0] in self._segments and \
+           tags[1] == 'segment':
+            return tuple(self._segments[tags[0]][:self._num_runs[tags[0]]])
+        if len(tags) == 2 and tags[0] == self.LABEL and \
+           str(tags[1]).isdigit():
+            text, x, items = self._shown_labels.get(int(tags[1]), ('', 0, ()))
+            return tuple(items)
+        if len(tags) != 3 or not str(tags[1]).isdigit():
+            return ()
+        key, page, part = tags
+        spec, items = self._drawn.get((key, int(page), part), (None, ()))
+        return tuple(items)
 
     def _detect_page_number(self, ex, ey):
-        ''' '''
-        positions, max_r = self._get_positions()
-        rsq = (max_r * self._ratios[0]) ** 2
-        for index, position in enumerate(positions):
-            x, y = position
-            if rsq >= self.distsq(x, y, ex, ey):
-                return index
+        ''' Returns the id of the page with the marker at (ex, ey), else -1.
+
+        Markers are evenly spaced, so the only candidate marker is calculated
+            directly from ex, and checked against the outer marker radius. This
+            takes constant time regardless of the number of pages. If pages are
+            drawn as runs (see DENSE_SPACING), the nearest page to ex is
+            returned for any point within the bar.
+
+        self._detect_page_number(int, int) -> int
+
+        '''
+        if not self._num_visible:
+            return -1
+        geometry = self._get_geometry()
+        index = int(ex // geometry.spacing)
+        if geometry.spacing < self.DENSE_SPACING: # nearest page in the bar
+            outer_ratio = self._ratios[self.LAYERS.index(self.OUTER)]
+            if abs(ey - geometry.y) > geometry.y * 0.9 * outer_ratio:
+                return -1
+            return self._first + max(0, min(index, self._num_visible - 1))
+        if not 0 <= index < self._num_visible:
+            return -1
+        rsq = geometry.radii[self.OUTER] ** 2
+        if rsq >= self.distsq(geometry.xs[index], geometry.y, ex, ey):
+            return self._first + index
         return -1
 
     @staticmethod
@@ -583,19 +1973,54 @@ class ProgressBar(tk.Canvas):
         return (x2 - x1)**2 + (y2 - y1)**2
 
 
+class BarGeometry(object):
+    ''' Marker positions and sizes for a ProgressBar layout. '''
+    __slots__ = ('xs', 'y', 'label_y', 'spacing', 'max_r', 'radii', 'offsets')
+
+    def __init__(self, width, height, num_pages, ratios, thetas, layers,
+                 label_height=0):
+        ''' Calculates the geometry of num_pages evenly spaced markers.
+
+        'xs' is an array of the marker centre x-coordinates, and 'y' is their
+            shared y-coordinate.
+        'radii' maps each layer in 'layers' to its marker radius, using the
+            corresponding ratio of the maximum radius.
+        'offsets' maps each layer to the (x, y) offsets (r cos(theta),
+            r sin(theta)) where the lines between markers meet the circles.
+        'label_height' is the height left under the markers for labels, with
+            their shared centre y-coordinate 'label_y'.
+
+        Constructor: BarGeometry(float, float, int, list[float],
+                                 dict[str:float], tuple[str], *float)
+
+        '''
+        bar_height = max(height - label_height, 0)
+        self.spacing = spacing = width / num_pages
+        self.y = bar_height / 2
+        self.label_y = bar_height + label_height / 2
+        self.xs = array('d', (spacing * (index + 0.5) for index in \
+                              range(num_pages)))
+        self.max_r = min(bar_height/2, spacing/2) * 0.9
+        self.radii = {}
+        self.offsets = {}
+        for layer, ratio in zip(layers, ratios):
+            r = self.radii[layer] = self.max_r * ratio
+            theta = radians(thetas[layer])
+            self.offsets[layer] = (r * cos(theta), r * sin(theta))
+
+
 if __name__ == '__main__':
     from random import randint
     root = tk.Tk()
     N = 5 # number of pages to generate
     pN = lambda n : (lambda: print('p{}_in'.format(n)) or True,
-                     lambda: print('p{}_out'.format(n)) or True)
+                     lambda: print('p{}_out'.format(n)) or True,
+                     'page {}'.format(n),
+                     lambda page: tk.Label(page, text='I am page {}'.format(n),
+                        bg='#{:06x}'.format(randint(0xAAAAAA,0xFFFFFF))).grid(
+                            sticky='nsew'))
     PM = PageManager(root, [pN(n) for n in range(N)], up_to=0,
                      enforce_upto=True, progress_bar=True,
-                     width=300, height=500)
-    
-    for n in range(N):
-        tk.Label(PM.get_page(n), text='I am page {}'.format(n),
-                 bg='#{:06x}'.format(randint(0xAAAAAA,0xFFFFFF))).grid(
-                     sticky='nsew')
+                     width=300, height=500, page_budget=3)
 
     PM.grid(sticky='nsew')
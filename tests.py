@@ -1,8 +1,42 @@
 #!/usr/bin/env python3
 
 import tkinter as tk
+import asyncio
+import threading
 from TestRun import TestRun
 
+# picklable transition functions, for validation in other processes
+def _valid():
+    ''' '''
+    return True
+
+def _invalid():
+    ''' '''
+    return False
+
+class _CallCounter(object):
+    ''' Wraps a Tcl interpreter, counting the round trips made to it. '''
+    def __init__(self, tk):
+        ''' '''
+        self._tk = tk
+        self.calls = 0
+        self.scripts = [] # scripts evaluated, e.g. batches of commands
+
+    def call(self, *args):
+        ''' '''
+        self.calls += 1
+        return self._tk.call(*args)
+
+    def eval(self, script):
+        ''' '''
+        self.calls += 1
+        self.scripts.append(script)
+        return self._tk.eval(script)
+
+    def __getattr__(self, name):
+        ''' '''
+        return getattr(self._tk, name)
+
 class PageManagerTests(TestRun):
     ''' A test suite ensuring correct functionality of PageManager. '''
     # wrapper for TestRun.run_tests, creates and destroys GUI window.
@@ -151,9 +185,573 @@ class PageManagerTests(TestRun):
         PM.change_page(5) # attempt to change to page 5 (fail, 4 not viewed)
         # values should be up_to=3, page_count=6, current_page=3
         self._general_getter_test(PM, r(3), r(6), r(3))
+
+
+    def test_page_budget(self):
+        ''' Tests lazy page construction and the 'page_budget' option. '''
+        built = [] # ids of pages in the order they were built
+        page = lambda n : (lambda:True, lambda:True, str(n),
+                           lambda p: built.append(n))
+        PM = PageManager(self._root, [page(n) for n in range(10)],
+                         page_budget=2)
+
+        # only the first page should be built on startup
+        assert built == [0], 'Only page 0 should be built, not {}'.format(built)
+
+        PM.change_page(5) # skim to page 5 (skimmed pages are not built)
+        assert built == [0, 5], \
+               'Only pages 0 and 5 should be built, not {}'.format(built)
+
+        PM.change_page(3) # build page 3, evicting page 0
+        PM.change_page(0) # page 0 should be rebuilt
+        assert built == [0, 5, 3, 0], \
+               'Page 0 should have been rebuilt, not {}'.format(built)
+        realized = sum(p.is_realized() for p in PM.get_navigator().get_pages())
+        assert realized == 2, \
+               'Only 2 pages should be built, not {}'.format(realized)
+
+        PM = PageManager(self._root, [page(n) for n in range(3)],
+                         page_budget=1)
+        PM.get_page(2) # over budget, but the only older page is shown
+        assert PM.get_navigator().get_page(2).is_realized(), \
+               'The page being accessed should not be evicted'
+
+    def test_change_page_async(self):
+        ''' Tests the 'change_page_async' method. '''
+        async def enter(result): # a coroutine enter_page function
+            await asyncio.sleep(0)
+            return result
+
+        PM = PageManager(self._root, [(), (lambda:enter(True),),
+                                      (lambda:enter(False),), ()])
+
+        task = PM.change_page_async(3) # attempt to change to page 3
+        while not task.done():
+            self._root.update() # keep the GUI responsive while changing
+        # should fail on entry to page 2, and return to page 1
+        assert task.result() is False, 'Should fail to change to page 3.'
+        current_page = PM.get_current_page_id()
+        assert current_page == 1, \
+               'Current page should be 1, not {}'.format(current_page)
+
+
+    def test_change_page_executor(self):
+        ''' Tests superseding a navigation running on an executor. '''
+        from concurrent.futures import ThreadPoolExecutor
+        started, release = threading.Event(), threading.Event()
+        entered = [] # ids of pages in the order they were entered
+        def enter(n):
+            entered.append(n)
+            if n == 1 and not release.is_set():
+                started.set()
+                release.wait() # a slow, blocking enter function
+            return True
+        page = lambda n: {'enter': lambda: enter(n), 'pure': n == 1}
+        executor = ThreadPoolExecutor(1)
+        PM = PageManager(self._root, [page(n) for n in range(4)],
+                         executor=executor)
+
+        first = PM.change_page_async(3)
+        while not started.is_set():
+            self._root.update()
+        second = PM.change_page_async(2) # supersedes the first navigation
+        release.set()
+        while not (first.done() and second.done()):
+            self._root.update()
+        assert first.result() is False and second.result() is True, \
+               'Only the second navigation should succeed'
+        # page 1's cancelled result is not memoized, so it is entered again
+        assert entered == [0, 1, 0, 1, 2], \
+               'Should roll back to page 0, then skim to page 2, not ' \
+               '{}'.format(entered)
+        current_page = PM.get_current_page_id()
+        assert current_page == 2, \
+               'Current page should be 2, not {}'.format(current_page)
+        cursor = PM._progress.cget('cursor')
+        assert not cursor, 'Busy state should be cleared, not {}'.format(cursor)
+        executor.shutdown()
+
+
+    def test_prefetch(self):
+        ''' Tests that prefetched results are passed to enter functions. '''
+        entered = [] # (page, data) for each call to an enter function
+        page = lambda n : {'enter': lambda data: entered.append((n, data)) or
+                                    True,
+                           'prefetch': lambda: n * 10}
+        PM = PageManager(self._root, [page(n) for n in range(3)])
+
+        PM.change_page() # page 1 should have been prefetched in the background
+        PM.change_page() # page 2 should have been prefetched on page 1
+        assert entered == [(0, 0), (1, 10), (2, 20)], \
+               'Enter functions should receive prefetched data, not {}'.format(
+                   entered)
+
+
+    def test_insert_pages(self):
+        ''' Tests the 'insert_pages' method. '''
+        page = lambda label : (lambda:True, lambda:True, label)
+        PM = PageManager(self._root, [page(n) for n in '0123'])
+        PM.change_page(2) # move to page 2 (up to page 2)
+
+        PM.insert_pages(1, page('a'), page('b')) # insert before current page
+        labels = ''.join(PM.get_page(n).get_label() for n in range(6))
+        assert labels == '0ab123', \
+               'Pages should be ordered 0ab123, not {}'.format(labels)
+        state = PM.get_upto(), PM.get_page_count(), PM.get_current_page_id()
+        # values should be up_to=4, page_count=6, current_page=4
+        assert state == (4, 6, 4), \
+               '(up_to, page_count, current_page) should be (4, 6, 4), ' +\
+               'not {}'.format(state)
+
+        PM.insert_pages(5, page('c')) # insert after current page
+        state = PM.get_upto(), PM.get_page_count(), PM.get_current_page_id()
+        assert state == (4, 7, 4), \
+               '(up_to, page_count, current_page) should be (4, 7, 4), ' +\
+               'not {}'.format(state)
+
+
+    def test_page_keys(self):
+        ''' Tests navigation and lookup using stable page keys. '''
+        page = lambda n : {'label': 'page {}'.format(n), 'key': 'p{}'.format(n)}
+        PM = PageManager(self._root, [page(n) for n in range(5)])
+
+        PM.change_page('p3') # change to page 3 by key
+        current_page = PM.get_current_page_id()
+        assert current_page == 3, \
+               'Current page should be 3, not {}'.format(current_page)
+
+        PM.remove_pages(['p0', 1]) # keys should be unaffected by removal
+        page_id = PM.get_page_id('p3')
+        assert page_id == 1, 'Page p3 should have id 1, not {}'.format(page_id)
+
+        key = PM.find_page('page 4')
+        assert key == 'p4', 'Page 4 should have key p4, not {}'.format(key)
+
+    def test_remove_pages(self):
+        ''' Tests removing built pages, including the current page. '''
+        page = lambda n : {'label': 'page {}'.format(n), 'key': 'p{}'.format(n)}
+        PM = PageManager(self._root, [page(n) for n in range(5)],
+                         progress_bar=True)
+        for n in range(1, 4):
+            PM.change_page(n) # build pages 0 to 3, ending on page 3
+        frames = [PM.get_page(n) for n in range(4)]
+        PM.remove_pages(['p1', 3]) # remove page 1 and the current page
+        removed = [n for n in range(4) if not frames[n].winfo_exists()]
+        assert removed == [1, 3], \
+               'Frames 1 and 3 should be destroyed, not {}'.format(removed)
+        key = PM.get_page_key()
+        assert key == 'p2', \
+               'Page p2 (before page p3) should be current, not {}'.format(key)
+        assert PM._shown is PM.get_navigator().get_page('p2') and \
+               frames[2].winfo_manager(), 'Page p2 should be displayed'
+        num_pages = PM._progress._num_pages
+        assert num_pages == 3, \
+               'Progress should show 3 pages, not {}'.format(num_pages)
+
+    def test_batch(self):
+        ''' Tests coalescing progress redraws within 'batch'. '''
+        PM = PageManager(self._root, [(), ()], progress_bar=True)
+        bar = PM._progress._displays['progress_bar']
+        redraws = [] # arguments of each redraw of the progress bar
+        redraw = bar.redraw
+        bar.redraw = lambda *args, **kwargs: redraws.append(args) or \
+                     redraw(*args, **kwargs)
+        PM.add_pages(()) # leave a redraw pending before the batch
+        with PM.batch():
+            for n in range(10):
+                PM.add_pages((), ())
+                PM.change_page()
+                self._root.update() # pending redraws shouldn't run
+            assert not redraws, 'Progress should not be redrawn in a batch, ' \
+                                'but was redrawn {} times'.format(len(redraws))
+        assert len(redraws) == 1, 'Progress should be redrawn once after a ' \
+                                  'batch, not {} times'.format(len(redraws))
+        state = redraws[0][0], redraws[0][2] # num_pages, current_page
+        assert state == (23, 10), 'Progress should be redrawn with the ' \
+               'final state (23, 10), not {}'.format(state)
+
+    def test_relabel_page(self):
+        ''' Tests relabelling a built page, and redrawing its label. '''
+        page = lambda label : {'label': label, 'key': label}
+        PM = PageManager(self._root, [page(n) for n in 'abc'],
+                         progress_bar=True, bar_labels=True)
+        bar = PM._progress._displays['progress_bar']
+        PM._progress.flush()
+        PM.get_page(1).set_label('x') # relabel the Page frame
+        PM._progress.flush()
+        label = PM.get_navigator().get_page(1).get_label()
+        assert label == 'x', 'Page 1 should be labelled x, not {}'.format(label)
+        key = PM.find_page('x')
+        assert key == 'b', 'Page x should have key b, not {}'.format(key)
+        items = bar.find_withtags('label', 1)
+        text = bar.itemcget(items[0], 'text') if items else None
+        assert text == 'x', 'Page 1 should be drawn labelled x, not ' \
+                            '{}'.format(text)
+
+
+    def test_visited(self):
+        ''' Tests tracking of (possibly non-contiguous) viewed pages. '''
+        page = lambda : (lambda:True, lambda:True)
+        PM = PageManager(self._root, [page() for n in range(4)],
+                         enforce_upto=True)
+        for n in range(3):
+            PM.change_page() # view all pages
+        PM.insert_pages(2, page()) # insert an unviewed page at 2
+
+        visited = PM.get_visited()
+        assert visited == b'\x01\x01\x00\x01\x01', \
+               'Only page 2 should be unviewed, not {}'.format(visited)
+        assert not PM.all_visited(0, 3), 'Pages 0 to 2 are not all viewed.'
+
+        PM.change_page(0) # return to the start
+        PM.change_page(4) # skim page 1, then fail as page 2 has not been viewed
+        current_page = PM.get_current_page_id()
+        assert current_page == 1, \
+               'Current page should be 1, not {}'.format(current_page)
+
+
+    def test_memoized_transitions(self):
+        ''' Tests memoization and invalidation of pure page transitions. '''
+        calls = [] # ids of pages whose enter function was called
+        page = lambda n : {'enter': lambda: calls.append(n) or True,
+                           'pure': True, 'inputs': ['x'] if n == 2 else []}
+        PM = PageManager(self._root, [page(n) for n in range(4)])
+        PM.change_page(3) # skim pages 1 and 2, memoizing their results
+        PM.change_page(0)
+
+        del calls[:]
+        PM.change_page(3) # skimming should reuse the memoized results
+        assert calls == [3], 'Only page 3 should be entered, not {}'.format(
+            calls)
+
+        PM.change_page(0)
+        del calls[:]
+        PM.invalidate_input('x') # page 2 depends on 'x', so should be re-run
+        PM.change_page(3)
+        assert calls == [2, 3], \
+               'Only pages 2 and 3 should be entered, not {}'.format(calls)
+
+    def test_page_dependencies(self):
+        ''' Tests invalidation and concurrent validation of dependent pages. '''
+        from concurrent.futures import ThreadPoolExecutor
+        calls = [] # ids of pages whose enter function was called
+        page = lambda n : {'enter': lambda: calls.append(n) or True,
+                           'key': n, 'pure': True,
+                           'depends': ['p1'] if n == 'p3' else []}
+        executor = ThreadPoolExecutor(max_workers=2)
+        PM = PageManager(self._root, [page('p{}'.format(n)) for n in range(5)],
+                         executor=executor)
+        PM.change_page(4) # pages 1 to 3 validated on the executor
+        assert calls.index('p1') < calls.index('p3') and calls[-1] == 'p4', \
+               'p3 should be entered after p1, and p4 last, not {}'.format(
+                   calls)
+
+        PM.change_page(0)
+        del calls[:]
+        PM.invalidate('p1') # p3 depends on p1, so should also be re-run
+        PM.change_page(4)
+        assert sorted(calls[:-1]) == ['p1', 'p3'] and calls[-1] == 'p4', \
+               'Only p1, p3 and p4 should be entered, not {}'.format(calls)
+        executor.shutdown()
+
+    def test_process_validation(self):
+        ''' Tests validation of picklable pure pages in other processes. '''
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=2)
+        pages = [{'enter': _valid, 'pure': True} for n in range(6)]
+        pages[3]['enter'] = _invalid
+        pages[2]['enter'] = lambda: True # not picklable, so run when skimmed
+        PM = PageManager(self._root, pages, validation_executor=executor)
+        assert not PM.change_page(5), 'Page 3 should not be skimmed past'
+        current_page = PM.get_current_page_id()
+        assert current_page == 2, \
+               'Current page should be 2, not {}'.format(current_page)
+        executor.shutdown()
+
+    def test_progress_item_pool(self):
+        ''' Tests that progress bar redraws reuse existing canvas items. '''
+        from page_classes import ProgressBar
+        bar = ProgressBar(self._root, width=300, height=30)
+        bar.redraw(10, 4, 2)
+        bar.redraw(5, 4, 2) # fewer pages
+        num_items = len(bar.find_all())
+        bar.redraw(10, 4, 2) # items drawn for each layout should be reused
+        bar.redraw(5, 4, 2)
+        assert len(bar.find_all()) == num_items, \
+               'Should have {} canvas items, not {}'.format(
+                   num_items, len(bar.find_all()))
+        bar.destroy()
+
+    def test_progress_round_trips(self):
+        ''' Tests that a progress bar redraw takes O(1) Tcl round trips. '''
+        from page_classes import ProgressBar
+        for num_pages in (10, 1000):
+            bar = ProgressBar(self._root, width=300, height=30)
+            bar.tk = counter = _CallCounter(bar.tk)
+            bar.redraw(num_pages, num_pages // 2, 2)
+            assert counter.calls <= 2, \
+                   'Drawing {} pages took {} round trips'.format(num_pages,
+                                                               counter.calls)
+            bar.destroy()
+        bar = ProgressBar(self._root, width=300, height=60)
+        bar.redraw(10, 4, 2, labels=lambda page: 'page\n{}'.format(page))
+        text = bar.itemcget(bar.find_withtags('label', 2)[0], 'text')
+        assert text == 'page\n2', \
+               'Batched text should keep its line breaks, not {!r}'.format(text)
+        bar.destroy()
+
+    def test_progress_step(self):
+        ''' Tests that a one page step redraws O(1) progress bar markers. '''
+        from page_classes import ProgressBar
+        num_commands = [] # commands batched for a step, for each page count
+        for num_pages in (100, 1000):
+            bar = ProgressBar(self._root, width=3 * num_pages, height=30)
+            bar.redraw(num_pages, 50, 50)
+            bar.tk = counter = _CallCounter(bar.tk)
+            bar.redraw(num_pages, 51, 51)
+            num_commands.append(sum(script.count(bar._w)
+                                    for script in counter.scripts))
+            bar.destroy()
+        assert num_commands[0] == num_commands[1] <= 20, \
+               'A step should take a constant number of commands, not ' \
+               '{} then {}'.format(*num_commands)
+
+    def test_progress_window(self):
+        ''' Tests drawing and clicking a window of visible pages. '''
+        from page_classes import ProgressBar
+        num_items = []
+        for num_pages in (1000, 10000):
+            bar = ProgressBar(self._root, width=300, height=30,
+                              visible_pages=10)
+            bar.redraw(num_pages, 500, 500)
+            num_items.append(len(bar.find_all()))
+            # markers are 30px apart, and the current page is centred
+            page_id = bar._detect_page_number(105, 15)
+            assert page_id == 498, \
+                   'Page 498 should be clicked, not {}'.format(page_id)
+            bar.scroll(5)
+            page_id = bar._detect_page_number(105, 15)
+            assert page_id == 503, \
+                   'Page 503 should be clicked, not {}'.format(page_id)
+            bar.destroy()
+        assert num_items[0] == num_items[1], \
+               'The number of items should not depend on the number of ' \
+               'pages, but was {} then {}'.format(*num_items)
+        bar = ProgressBar(self._root, width=300, height=30, visible_pages=10)
+        bar.event_generate('<Button-4>') # scrolling before any pages drawn
+        bar.destroy()
+
+    def test_progress_density(self):
+        ''' Tests drawing and clicking runs of pages denser than pixels. '''
+        from page_classes import ProgressBar
+        bar = ProgressBar(self._root, width=300, height=30,
+                          highlightthickness=0, bd=0) # exactly 300x30 px
+        visited = bytearray(1000)
+        visited[:100] = b'\x01' * 100 # a run of visited pages
+        visited[500:510] = b'\x01' * 10 # and another, around the current page
+        bar.redraw(1000, 509, 505, visited=visited)
+        num_items = len(bar.find_all())
+        assert num_items <= 4, \
+               'Should draw one item per run of pages, not {}'.format(num_items)
+        page_id = bar._detect_page_number(151, 15)
+        assert page_id == 503, 'Page 503 should be clicked, not {}'.format(
+            page_id)
+        x0, y0, x1, y1 = bar.coords(bar.find_withtags('current', 'segment')[0])
+        assert x0 == 0 and abs(x1 - 506 * 0.3) < 1e-6, \
+               'The current run should span pages 0 to 505, as markers do'
+        bar.destroy()
+
+    def test_progress_sprites(self):
+        ''' Tests drawing progress bar markers with cached sprites. '''
+        from page_classes import ProgressBar
+        bar = ProgressBar(self._root, width=300, height=30, sprites=True)
+        bar.redraw(10, 4, 2)
+        kinds = {bar.type(item) for item in bar.find_withtag('circle')}
+        assert kinds == {'image'}, \
+               'Markers should be images, not {}'.format(kinds)
+        num_sprites = len(bar._sprites)
+        bar.redraw(10, 7, 5) # the same marker shapes, so no new sprites
+        assert len(bar._sprites) == num_sprites, \
+               'Should have {} sprites, not {}'.format(num_sprites,
+                                                       len(bar._sprites))
+        bar.destroy()
+        calls = [] # round trips to draw sprites of increasing radius
+        for height in (30, 300):
+            bar = ProgressBar(self._root, width=3000, height=height,
+                              highlightthickness=0, bd=0, sprites=True)
+            bar.tk = counter = _CallCounter(bar.tk)
+            bar.redraw(10, 4, 2)
+            calls.append(counter.calls)
+            bar.destroy()
+        assert calls[0] == calls[1], 'Rendering larger sprites should take ' \
+               'the same number of round trips, not {} and {}'.format(*calls)
+
+    def test_progress_tag_index(self):
+        ''' Tests finding progress bar items without querying Tcl. '''
+        from page_classes import ProgressBar
+        bar = ProgressBar(self._root, width=300, height=30)
+        bar.redraw(10, 4, 2)
+        bar.tk = counter = _CallCounter(bar.tk)
+        items = bar.find_withtags('current', '2', 'circle')
+        assert len(items) == 1 and counter.calls == 0, \
+               'Should find 1 item with no round trips, not {} with {}'.format(
+                   len(items), counter.calls)
+        assert not bar.find_withtags('current', '3', 'circle'), \
+               'Page 3 should have no current marker'
+        bar.destroy()
+
+    def test_progress_resize(self):
+        ''' Tests scaling a progress bar while resizing, then redrawing. '''
+        from page_classes import ProgressBar
+        from types import SimpleNamespace
+        bar = ProgressBar(self._root, width=300, height=30,
+                          highlightthickness=0, bd=0) # exactly 300x30 px
+        bar.redraw(1000, 400, 200)
+        item = bar.find_withtags('outer', 'segment')[0]
+        x1 = bar.coords(item)[2]
+        items = set(bar.find_all())
+        bar._on_configure(SimpleNamespace(width=600, height=30))
+        assert bar.coords(item)[2] == 2 * x1, \
+               'Items should be scaled to the new width while resizing'
+        bar._settle() # resizing has stopped
+        assert set(bar.find_all()) == items, \
+               'Redrawing after resizing should reuse the existing items'
+        bar.redraw(0, -1, 0) # all pages removed
+        bar._on_configure(SimpleNamespace(width=300, height=30))
+        bar._settle()
+        assert not bar.find_withtags('outer', 'segment') and \
+               bar._detect_page_number(150, 15) == -1, \
+               'No pages should be drawn or clicked after removing them all'
+        bar.destroy()
+
+    def test_progress_labels(self):
+        ''' Tests drawing page labels under the progress bar markers. '''
+        from page_classes import ProgressBar
+        bar = ProgressBar(self._root, width=300, height=40)
+        label = lambda page: 'page {}'.format(page)
+        bar.redraw(1000, 400, 200, labels=label)
+        shown = [page for page in range(1000) if bar.find_withtags('label',
+                                                                   page)]
+        assert 200 in shown, 'The current page label should be drawn'
+        assert 1 < len(shown) < 1000, \
+               'Overlapping labels should be left out, but {} of 1000 ' \
+               'were drawn'.format(len(shown))
+        items = set(bar.find_all())
+        bar.redraw(1000, 400, 201, labels=label)
+        assert bar.find_withtags('label', 201) and \
+               not bar.find_withtags('label', 200), \
+               'The label of the new current page should be drawn instead'
+        assert set(bar.find_all()) == items, \
+               'Changing page should reuse the existing label items'
+        bar.redraw(1000, 400, 201)
+        assert not bar.find_withtags('label', 201), \
+               'Labels should not be drawn without a label function'
+        bar.redraw(10, 4, 2, labels=label)
+        bar.redraw(10, 4, 2) # markers move down into the unused label space
+        x0, y0, x1, y1 = bar.coords(bar.find_withtags('outer', '2',
+                                                      'circle')[0])
+        assert (y0 + y1) / 2 == bar.get_size()[1] / 2, \
+               'Markers should be centred once labels are removed'
+        looked_up = [] # ids of pages whose labels were got
+        unlabelled = lambda page: looked_up.append(page) or ''
+        bar.redraw(1000, 400, 200, labels=unlabelled)
+        del looked_up[:]
+        bar.redraw(1000, 400, 201, labels=unlabelled)
+        assert not looked_up, 'Labels should be cached, but {} pages were ' \
+                              'looked up again'.format(len(looked_up))
+        bar.redraw(3, 0, 0, labels=['a', 'b', 'c']) # a sequence of labels
+        assert bar.find_withtags('label', 2), \
+               'Labels should be drawn from a sequence'
+        bar.redraw(3, 0, 0, labels=[])
+        assert not bar.find_withtags('label', 2), \
+               'Labels should not be drawn from an empty sequence'
+        bar.destroy()
         
 
+class NavigatorTests(TestRun):
+    ''' A test suite for the Navigator, which requires no GUI. '''
+    def test_change_page(self):
+        ''' Tests skimming, rollback and hooks of headless navigation. '''
+        opened = [] # ids of pages opened, as reported by the on_open hook
+        pages = [HeadlessPage(), HeadlessPage(), HeadlessPage(lambda: False),
+                 HeadlessPage()]
+        nav = Navigator(pages, on_open=opened.append)
+        assert nav.change_page(1) and opened == [0, 1], \
+               'Pages 0 and 1 should be opened, not {}'.format(opened)
+        assert not nav.change_page(3), 'Page 2 should not be skimmed past'
+        current_page = nav.get_current_page_id()
+        assert current_page == 1, \
+               'Current page should be 1, not {}'.format(current_page)
+        visited = nav.get_visited()
+        assert visited == b'\x01\x01\x00\x00', \
+               'Only pages 0 and 1 should be visited, not {}'.format(visited)
+
+    def test_remove_pages(self):
+        ''' Tests removing pages from a headless Navigator. '''
+        discarded = [] # keys of pages reported by the on_discard hook
+        discard = lambda page: discarded.append(page.get_key())
+        nav = Navigator([HeadlessPage(key=n) for n in 'abcd'],
+                        on_discard=discard)
+        nav.change_page(3)
+        removed = nav.remove_pages(['b', 0])
+        assert removed == [0, 1] and discarded == ['a', 'b'], \
+               'Pages a and b should be removed, not {}'.format(discarded)
+        current_page = nav.get_current_page_id()
+        assert current_page == 1 and nav.get_page_id('d') == 1, \
+               'Current page should be 1 (page d), not {}'.format(current_page)
+        try:
+            nav.insert_pages(0, HeadlessPage(key='e'), HeadlessPage(key='c'))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('Inserting a duplicate key should fail')
+        nav.insert_pages(0, HeadlessPage(key='e', label='e'))
+        assert nav.find_page('e') == 'e', 'Page e should be found by label'
+        nav.get_page('d').set_label('x')
+        nav.get_page('c').set_label('x') # relabelled into an existing label
+        assert nav.find_page('x') == 'c', \
+               'Page c (the first labelled x) should be found by label'
+        try:
+            nav.remove_pages([3])
+        except IndexError:
+            pass
+        else:
+            raise AssertionError('Removing an out of range page should fail')
+
+    def test_validation(self):
+        ''' Tests validating skimmed pure pages on a validation executor. '''
+        from concurrent.futures import ThreadPoolExecutor
+        calls = [] # keys of pages whose enter functions were run
+        enter = lambda key: lambda: calls.append(key) or True
+        executor = ThreadPoolExecutor(2)
+        loop = asyncio.new_event_loop()
+        nav = Navigator([HeadlessPage(key='a'), HeadlessPage(enter('b')),
+                         HeadlessPage(enter('c'), pure=True, depends=('b',))],
+                        validation_executor=executor, loop=loop)
+        async def change_page(): # while the loop is running
+            return nav.change_page(2)
+        assert loop.run_until_complete(change_page()), \
+               'Page 2 should be changed to while the loop is running'
+        assert calls == ['b', 'c'], \
+               'Page c should run once, after page b, not {}'.format(calls)
+        async def fail():
+            return False
+        nav = Navigator([HeadlessPage(),
+                         HeadlessPage(lambda: fail(), pure=True),
+                         HeadlessPage()], validation_executor=executor,
+                        loop=loop)
+        assert not nav.change_page(2), \
+               'The awaitable result should be awaited when skimmed, and fail'
+        current_page = nav.get_current_page_id()
+        assert current_page == 0, \
+               'Current page should be 0, not {}'.format(current_page)
+        loop.close()
+        executor.shutdown()
+
 if __name__ == '__main__':
     from page_classes import PageManager, Page
+    from navigation import Navigator, HeadlessPage
     Tests = PageManagerTests()
     Tests.run_tests(verbose=True)
+    NavTests = NavigatorTests()
+    NavTests.run_tests(verbose=True)